@@ -0,0 +1,58 @@
+"""Benchmark decoding coverage raster colors back to signal levels.
+
+Compares ColorProfile.decode_values, which looks up every pixel of a raster
+in the profile's compiled table at once, with looking up each pixel's color
+in a dict.
+
+Usage: python -m benchmarks.color_decode [size ...]
+"""
+import sys
+import timeit
+
+import numpy as np
+
+from signalserver_gui.colors import ColorProfile
+
+
+def random_raster(profile: ColorProfile, size: int) -> np.ndarray:
+    """Return a size x size raster of profile colors and white background."""
+    rng = np.random.default_rng(0)
+    palette = np.array(profile.colors + [(255, 255, 255)], dtype=np.uint8)
+    return palette[rng.integers(0, len(palette), (size, size))]
+
+
+def by_pixel(profile: ColorProfile, raster: np.ndarray) -> np.ndarray:
+    """Decode a raster one pixel at a time."""
+    values = np.full(raster.shape[:2], np.nan, dtype=np.float32)
+    for row in range(raster.shape[0]):
+        for column, color in enumerate(raster[row].tolist()):
+            band = profile.lookup(color)
+            if band is not None:
+                values[row, column] = profile.levels[band]
+    return values
+
+
+def main(sizes) -> None:
+    """Print the time to decode rasters both ways for each raster size."""
+    profile = ColorProfile.from_file("data/color_profiles/rainbow.dcf")
+    print(f"{'pixels':>10} {'by pixel':>10} {'table':>10} {'speedup':>8}")
+    for size in sizes:
+        raster = random_raster(profile, size)
+        if not np.array_equal(
+            by_pixel(profile, raster), profile.decode_values(raster), equal_nan=True
+        ):
+            raise (Exception(f"{size} - Decoders disagree."))
+        legacy = min(
+            timeit.repeat(lambda: by_pixel(profile, raster), number=1, repeat=3)
+        )
+        table = min(
+            timeit.repeat(lambda: profile.decode_values(raster), number=1, repeat=3)
+        )
+        print(
+            f"{size * size:>10} {legacy * 1000:>8.1f}ms {table * 1000:>8.1f}ms"
+            f" {legacy / table:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(i) for i in sys.argv[1:]] or [100, 500, 2000])
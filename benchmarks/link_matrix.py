@@ -0,0 +1,89 @@
+"""Benchmark building the all pairs station link matrix.
+
+Compares LinkMatrix, which calls Geod.inv once over arrays of coordinates,
+with calling Geod.inv for one station pair at a time as make_kmz does, and
+LinkMatrix.rows with rounding the values of one pair at a time. Geod.inv
+solves each pair in C either way, so most of the gain is in the rows.
+
+Usage: python -m benchmarks.link_matrix [stations ...]
+"""
+import sys
+import timeit
+
+import numpy as np
+import pyproj
+
+from signalserver_gui.link_matrix import LinkMatrix
+
+
+def random_stations(count: int) -> list:
+    """Return (id, name, latitude, longitude) rows scattered over a region."""
+    rng = np.random.default_rng(0)
+    return [
+        (i, f"Station {i}", rng.uniform(40, 50), rng.uniform(-100, -90))
+        for i in range(count)
+    ]
+
+
+def by_pair(stations: list) -> list:
+    """Return the distance of every station pair, one Geod.inv call each."""
+    geodesic = pyproj.Geod(ellps="WGS84")
+    return [
+        geodesic.inv(a[3], a[2], b[3], b[2])[2]
+        for i, a in enumerate(stations)
+        for b in stations[i + 1 :]
+    ]
+
+
+def rows_by_pair(matrix: LinkMatrix, pairs: np.ndarray) -> list:
+    """Return the rows of the pairs, rounding one value at a time."""
+    return [
+        [
+            int(matrix.ids[i]),
+            matrix.names[i],
+            int(matrix.ids[j]),
+            matrix.names[j],
+            round(float(matrix.distance[k]), 4),
+            round(float(matrix.azimuth[k]), 2),
+            round(float(matrix.back_azimuth[k]), 2),
+            None
+            if np.isnan(matrix.free_space_path_loss[k])
+            else round(float(matrix.free_space_path_loss[k]), 2),
+        ]
+        for i, j, k in zip(matrix.first[pairs], matrix.second[pairs], pairs)
+    ]
+
+
+def main(sizes) -> None:
+    """Print the time to build the matrix and its rows both ways."""
+    print(
+        f"{'stations':>8} {'pairs':>8} {'by pair':>10} {'vectorized':>10} {'speedup':>8}"
+        f" {'rows by pair':>12} {'rows':>10} {'speedup':>8}"
+    )
+    for size in sizes:
+        stations = random_stations(size)
+        matrix = LinkMatrix(stations, 446)
+        pairs = matrix.select()
+        if not np.allclose(matrix.distance * 1000, by_pair(stations)):
+            raise (Exception(f"{size} - Distances disagree."))
+        if matrix.rows(pairs) != rows_by_pair(matrix, pairs):
+            raise (Exception(f"{size} - Rows disagree."))
+        timings = [
+            min(timeit.repeat(func, number=1, repeat=3))
+            for func in [
+                lambda: by_pair(stations),
+                lambda: LinkMatrix(stations, 446),
+                lambda: rows_by_pair(matrix, pairs),
+                lambda: matrix.rows(pairs),
+            ]
+        ]
+        print(
+            f"{size:>8} {size * (size - 1) // 2:>8} {timings[0] * 1000:>8.1f}ms"
+            f" {timings[1] * 1000:>8.1f}ms {timings[0] / timings[1]:>7.1f}x"
+            f" {timings[2] * 1000:>10.1f}ms {timings[3] * 1000:>8.1f}ms"
+            f" {timings[2] / timings[3]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(i) for i in sys.argv[1:]] or [10, 100, 500])
@@ -0,0 +1,69 @@
+"""Benchmark loading the point to point profile data files of a plot.
+
+Compares PathProfile.from_files and the binary sidecar read by
+PathProfile.load with the previous loader, which split every line of every
+file in Python and collected lists of tuples.
+
+Usage: python -m benchmarks.profile_loader [samples ...]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from signalserver_gui.profile import SERIES, SIDECAR, PathProfile
+
+
+def write_profile(file_base: str, samples: int) -> None:
+    """Write synthetic data files with the given number of samples."""
+    distance = np.linspace(0, 20, samples)
+    for i, name in enumerate(SERIES):
+        values = 100 + 10 * np.sin(distance * (i + 1))
+        np.savetxt(f"{file_base}_{name}", np.column_stack([distance, values]), "%f")
+
+
+def by_line(file_base: str) -> dict:
+    """Load the data files the way make_analysis_plot used to."""
+    series = {}
+    for name in SERIES:
+        with open(f"{file_base}_{name}") as f:
+            series[name] = [
+                (float(line.split(" ")[0]), float(line.split(" ")[1])) for line in f
+            ]
+    return series
+
+
+def main(sizes) -> None:
+    """Print the mean load time of both approaches for each profile size."""
+    print(
+        f"{'samples':>8} {'by line':>10} {'numpy':>10} {'sidecar':>10}"
+        f" {'speedup':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            file_base = os.path.join(tmp, f"profile_{size}")
+            write_profile(file_base, size)
+            PathProfile.from_files(file_base).save(f"{file_base}{SIDECAR}")
+            if not np.allclose(
+                PathProfile.from_files(file_base).profile, by_line(file_base)["profile"]
+            ):
+                raise (Exception(f"{size} - Loaders disagree."))
+            number = max(1, 100000 // size)
+            legacy = min(timeit.repeat(lambda: by_line(file_base), number=number))
+            bulk = min(
+                timeit.repeat(lambda: PathProfile.from_files(file_base), number=number)
+            )
+            binary = min(
+                timeit.repeat(lambda: PathProfile.load(file_base), number=number)
+            )
+            print(
+                f"{size:>8} {legacy / number * 1000:>8.2f}ms"
+                f" {bulk / number * 1000:>8.2f}ms {binary / number * 1000:>8.2f}ms"
+                f" {legacy / binary:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main([int(i) for i in sys.argv[1:]] or [100, 1000, 10000, 50000])
@@ -0,0 +1,48 @@
+"""Benchmark writing and loading analysis report json.
+
+Usage: python -m benchmarks.report_json [obstructions ...]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+from signalserver_gui.analysis_report.analysis_report import AnalysisReport
+
+from .report_parser import write_report
+
+
+def main(sizes) -> None:
+    """Print the mean time to write and load reports of each size."""
+    print(
+        f"{'obstructions':>12} {'parse txt':>10} {'to_json':>10} {'compact':>10}"
+        f" {'from_json':>10} {'bytes':>9} {'compact':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"report_{size}.txt")
+            write_report(path, size)
+            report = AnalysisReport.from_file(path)
+            indented = report.to_json()
+            compact = report.to_json(compact=True)
+            if AnalysisReport.from_json(compact).to_dict() != report.to_dict():
+                raise (Exception(f"{size} - Report does not round trip."))
+            number = max(1, 20000 // (size + 100))
+            timings = [
+                min(timeit.repeat(func, number=number)) / number * 1000
+                for func in [
+                    lambda: AnalysisReport.from_file(path),
+                    lambda: report.to_json(),
+                    lambda: report.to_json(compact=True),
+                    lambda: AnalysisReport.from_json(compact),
+                ]
+            ]
+            print(
+                f"{size:>12}"
+                + "".join(f" {timing:>8.3f}ms" for timing in timings)
+                + f" {len(indented):>9} {len(compact):>9}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(i) for i in sys.argv[1:]] or [0, 100, 1000, 10000])
@@ -0,0 +1,125 @@
+"""Benchmark the memory footprint and attribute access of analysis reports.
+
+Parses a synthetic report many times and measures the memory retained by
+the resulting AnalysisReport objects. For comparison, obstructions are also
+built with the previous layout: a per-instance __dict__ holding underscore
+attributes behind getter/setter properties.
+
+Usage: python -m benchmarks.report_memory [reports] [obstructions]
+"""
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from signalserver_gui.analysis_report.analysis_report import AnalysisReport
+from signalserver_gui.analysis_report.obstruction import Obstruction
+
+from .report_parser import write_report
+
+
+class DictObstruction:
+    """An obstruction using the layout the report classes had before slots."""
+
+    def __init__(self, longitude, latitude, distance, height, metric=False):
+        """Initialize a new DictObstruction instance."""
+        self.longitude = longitude
+        self.latitude = latitude
+        self.distance = distance
+        self.height = height
+        self.metric = metric
+
+    @property
+    def longitude(self):
+        """Getter/Setter for longitude property."""
+        return self._longitude
+
+    @longitude.setter
+    def longitude(self, new_value):
+        self._longitude = new_value
+
+    @property
+    def latitude(self):
+        """Getter/Setter for latitude property."""
+        return self._latitude
+
+    @latitude.setter
+    def latitude(self, new_value):
+        self._latitude = new_value
+
+    @property
+    def distance(self):
+        """Getter/Setter for distance property."""
+        return self._distance
+
+    @distance.setter
+    def distance(self, new_value):
+        self._distance = new_value
+
+    @property
+    def height(self):
+        """Getter/Setter for height property."""
+        return self._height
+
+    @height.setter
+    def height(self, new_value):
+        self._height = new_value
+
+    @property
+    def metric(self):
+        """Getter/Setter for metric property."""
+        return self._metric
+
+    @metric.setter
+    def metric(self, new_value):
+        self._metric = new_value
+
+
+def retained(build) -> int:
+    """Return the bytes still allocated by the objects build returns."""
+    tracemalloc.start()
+    objects = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main(reports: int, obstructions: int) -> None:
+    """Print memory per report and obstruction, and attribute access costs."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.txt")
+        write_report(path, obstructions)
+        template = AnalysisReport.from_file(path).link.obstructions
+        size = retained(
+            lambda: [AnalysisReport.from_file(path) for _ in range(reports)]
+        )
+    count = reports * len(template)
+    fields = [
+        (o.longitude, o.latitude, o.distance, o.height, o.metric) for o in template
+    ]
+    slotted = retained(
+        lambda: [Obstruction(*f) for _ in range(reports) for f in fields]
+    )
+    legacy = retained(
+        lambda: [DictObstruction(*f) for _ in range(reports) for f in fields]
+    )
+    print(f"{reports} reports with {obstructions} obstructions each")
+    print(
+        f"  reports:        {size / 2 ** 20:8.2f} MiB, {size / reports:9.0f} B/report"
+    )
+    print(f"  slotted:        {slotted / count:8.1f} B/obstruction")
+    print(f"  dict+property:  {legacy / count:8.1f} B/obstruction")
+    print(f"  memory saved:   {1 - slotted / legacy:8.0%}")
+    new, old = template[0], DictObstruction(*fields[0])
+    number = 1000000
+    slotted_access = timeit.timeit(lambda: new.height, number=number)
+    legacy_access = timeit.timeit(lambda: old.height, number=number)
+    print(f"  slotted read:   {slotted_access / number * 1e9:8.1f} ns")
+    print(f"  property read:  {legacy_access / number * 1e9:8.1f} ns")
+
+
+if __name__ == "__main__":
+    args = [int(i) for i in sys.argv[1:]]
+    main(*(args + [1000, 200][len(args) :]))
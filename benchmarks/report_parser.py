@@ -0,0 +1,117 @@
+"""Benchmark parsing signalserver analysis reports with many obstructions.
+
+Compares AnalysisReport.from_file, which reads the report once, with the
+section factory methods that each read the report on their own.
+
+Usage: python -m benchmarks.report_parser [obstructions ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+from signalserver_gui.analysis_report.analysis_report import AnalysisReport
+from signalserver_gui.analysis_report.link import Link
+from signalserver_gui.analysis_report.propagation_model import PropagationModel
+from signalserver_gui.analysis_report.site import Site
+
+REPORT = """\
+PPA Report
+
+Transmitter site: TX
+Site location: 51.5000, -0.5000
+Ground elevation: 95.14 feet AMSL
+Antenna height: 3.28 feet AGL / 98.42 feet AMSL
+Distance to Rx: 12.54 miles
+Azimuth to Rx: 128.49 degrees grid
+Downtilt angle to Rx: -0.0512 degrees
+
+Receiver site: RX
+Site location: 51.3500, -0.3400
+Ground elevation: 142.52 feet AMSL
+Antenna height: 32.81 feet AGL / 175.33 feet AMSL
+Distance to Tx: 12.54 miles
+Azimuth to Tx: 308.62 degrees grid
+Downtilt angle to Tx: -0.0451 degrees
+
+Propagation model: Irregular Terrain Model
+Model sub-type: Hata
+Earth's Dielectric Constant: 15.000
+Earth's Conductivity: 0.005 Siemens/meter
+Atmospheric Bending Constant (N-units): 301.000 ppm
+Frequency: 446.000 MHz
+Radio Climate: 5 (Continental Temperate)
+Polarization: 0 (Horizontal)
+Fraction of Situations: 50.0%
+Fraction of Time: 50.0%
+Receiver gain: 2.00 dBd
+Transmitter ERP plus Receiver gain: 10.00 Watts (+40.00 dBm)
+Transmitter ERP minus Receiver gain: 40.00 dBm
+Transmitter EIRP plus Receiver gain: 16.40 Watts (+42.15 dBm)
+Transmitter EIRP minus Receiver gain: 42.15 dBm
+
+Summary for the link between Tx and Rx:
+Free space path loss: 111.52 dB
+Computed path loss: 140.07 dB
+Attenuation due to terrain shielding: 28.55 dB
+Field strength at Rx: 55.87 dBuV/meter
+Signal power level at Rx: -100.07 dBm
+Signal power density at Rx: -119.98 dBW per square meter
+Voltage across 50 ohm dipole at Rx: 2.17 uV (6.73 dBuV)
+Voltage across 75 ohm dipole at Rx: 2.66 uV (8.49 dBuV)
+Longley-Rice model error number: 0 (No error)
+
+Between Tx and Rx, obstructions were detected at:
+{obstructions}
+Antenna at Rx must be raised to at least 120.00 feet AGL to clear all obstructions detected.
+Antenna at Rx must be raised to at least 180.00 feet AGL to clear the first Fresnel zone.
+Antenna at Rx must be raised to at least 150.00 feet AGL to clear 60% of the first Fresnel zone.
+"""
+
+
+def write_report(path: str, obstructions: int) -> None:
+    """Write a synthetic report with the given number of obstructions."""
+    lines = "".join(
+        f"    {51.5 - i * 1e-5:.4f} N,   {0.5 - i * 1e-5:.4f} W, "
+        f"{i * 0.01:.2f} miles, {100 + i % 50:.2f} feet AMSL\n"
+        for i in range(obstructions)
+    )
+    with open(path, "w") as f:
+        f.write(REPORT.format(obstructions=lines))
+
+
+def by_section(path: str) -> AnalysisReport:
+    """Parse a report with a separate pass for every section."""
+    return AnalysisReport(
+        Site.from_file(path, "tx"),
+        Site.from_file(path, "rx"),
+        PropagationModel.from_file(path),
+        Link.from_file(path),
+    )
+
+
+def main(sizes) -> None:
+    """Print the mean parse time of both approaches for each report size."""
+    print(f"{'obstructions':>12} {'by section':>12} {'single pass':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"report_{size}.txt")
+            write_report(path, size)
+            if json.loads(by_section(path).to_json()) != json.loads(
+                AnalysisReport.from_file(path).to_json()
+            ):
+                raise (Exception(f"{size} - Parsers disagree."))
+            number = max(1, 20000 // (size + 100))
+            legacy = min(timeit.repeat(lambda: by_section(path), number=number))
+            single = min(
+                timeit.repeat(lambda: AnalysisReport.from_file(path), number=number)
+            )
+            print(
+                f"{size:>12} {legacy / number * 1000:>10.2f}ms"
+                f" {single / number * 1000:>10.2f}ms {legacy / single:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main([int(i) for i in sys.argv[1:]] or [0, 100, 1000, 10000])
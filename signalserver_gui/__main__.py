@@ -11,10 +11,13 @@ sys.path.insert(0, path)
 import configparser
 import functools
 import glob
+import json
 import os
 import re
 import shutil
 
+import numpy as np
+
 from bottle import (
     HTTPError,
     abort,
@@ -26,6 +29,7 @@ from bottle import (
     post,
     redirect,
     request,
+    response,
     route,
     run,
     static_file,
@@ -37,6 +41,20 @@ from sqlalchemy.sql.sqltypes import Boolean, Float, Integer
 
 from signalserver_gui import model
 from signalserver_gui import utils
+from signalserver_gui.coverage_stats import load_coverage_stats
+from signalserver_gui.jobs import (
+    JobQueue,
+    composite_name,
+    diff_name,
+    interference_name,
+)
+from signalserver_gui.link_matrix import link_matrix
+from signalserver_gui.link_report import LinkReport
+from signalserver_gui.profile import downsampled
+from signalserver_gui.raster import PlotRaster
+from signalserver_gui.renderer import renderer
+from signalserver_gui.spatial import nearest, within
+from signalserver_gui.tiles import load_tiles
 from signalserver_gui.model import global_args, plot_args
 from signalserver_gui.antenna import Antenna
 from signalserver_gui.station import Station
@@ -46,6 +64,7 @@ from signalserver_gui.plot import Plot
 
 template = functools.partial(jinja2_template, template_lookup=["templates"])
 config = configparser.ConfigParser()
+jobs = None
 
 
 @get("/")
@@ -175,16 +194,413 @@ def list_items(item_type, db):
 
 @get("/plot/<id:int>/generate")
 def plot_generate(id, db):
-    """Render the generate plot page."""
+    """Queue plot generation and redirect to the files page."""
     q = db.query(Plot).filter_by(id=id)
     item = q.first()
     if item:
-        utils.generate(config, item)
-        redirect(f"/plot/{id}/files")
+        job = jobs.submit_plot(item)
+        redirect(f"/plot/{id}/files?job={job.id}")
     else:
         redirect(f"/")
 
 
+@get("/plots/generate")
+def plots_generate(db):
+    """Queue generation of every plot and redirect to the plot list."""
+    for item in db.query(Plot).all():
+        jobs.submit_plot(item)
+    redirect("/plots?message=GenerationQueued")
+
+
+def analysis_status(kind: str, directory: str, name: str, filenames: list) -> dict:
+    """Return the job, files and summary of a multi plot analysis.
+
+    The analysis is written to directory/name in the output directory, with
+    its summary in <kind>.json.
+    """
+    job = jobs.latest(f"{kind}:{name}")
+    path = os.path.join(config["signalservergui"]["output_dir"], directory, name)
+    result = {
+        "name": name,
+        "job": job.to_dict() if job else None,
+        "files": {},
+        "summary": None,
+    }
+    for filename in filenames:
+        if os.path.isfile(os.path.join(path, filename)):
+            result["files"][filename] = f"/download/{directory}/{name}/{filename}"
+    try:
+        with open(os.path.join(path, f"{kind}.json")) as f:
+            result["summary"] = json.load(f)
+    except (OSError, ValueError):
+        pass
+    return result
+
+
+def composite_status(name: str) -> dict:
+    """Return the job, files and summary of a best server composite."""
+    return analysis_status(
+        "composite",
+        "composites",
+        name,
+        ["composite.png", "best_server.png", "composite.kmz"],
+    )
+
+
+def interference_status(name: str) -> dict:
+    """Return the job, files and summary of a C/I map."""
+    return analysis_status(
+        "interference",
+        "interference",
+        name,
+        ["interference.png", "interference.kmz"],
+    )
+
+
+def diff_status(name: str) -> dict:
+    """Return the job, files and summary of a comparison of two plots."""
+    return analysis_status("diff", "diffs", name, ["diff.png", "diff.kmz"])
+
+
+def query_plot_ids(db) -> list:
+    """Return the existing plot ids listed in the plots query parameter."""
+    try:
+        plot_ids = sorted(
+            {int(value) for value in request.query.plots.split(",") if value.strip()}
+        )
+    except ValueError:
+        abort(400, "plots must be a comma separated list of plot ids.")
+    if not plot_ids:
+        abort(400, "plots is required.")
+    found = {item.id for item in db.query(Plot).filter(Plot.id.in_(plot_ids))}
+    missing = [plot_id for plot_id in plot_ids if plot_id not in found]
+    if missing:
+        abort(404, f"Plots {missing} do not exist.")
+    return plot_ids
+
+
+@get("/plots/composite")
+def plots_composite(db):
+    """Queue the best server composite of the plots listed in plots.
+
+    plots is a comma separated list of plot ids. The response carries the
+    composite's name, which /composite/<name> reports the progress of.
+    """
+    plot_ids = query_plot_ids(db)
+    jobs.submit_composite(plot_ids)
+    return dict(composite_status(composite_name(plot_ids)), plots=plot_ids)
+
+
+@get("/composite/<name:re:[0-9a-f]+>")
+def composite(name):
+    """Return the progress and files of a best server composite."""
+    result = composite_status(name)
+    if not result["job"] and result["summary"] is None:
+        abort(404, f"Composite {name} does not exist.")
+    return result
+
+
+@get("/interference/<name:re:[0-9a-f]+>")
+def interference(name):
+    """Return the progress and files of a C/I map."""
+    result = interference_status(name)
+    if not result["job"] and result["summary"] is None:
+        abort(404, f"C/I map {name} does not exist.")
+    return result
+
+
+@get("/diff/<name:re:[0-9a-f]+>")
+def diff(name):
+    """Return the progress and files of a comparison of two plots."""
+    result = diff_status(name)
+    if not result["job"] and result["summary"] is None:
+        abort(404, f"Comparison {name} does not exist.")
+    return result
+
+
+@get("/jobs")
+def list_jobs():
+    """Return a summary of background jobs and their cpu usage."""
+    return {
+        "summary": jobs.summary(),
+        "jobs": [job.to_dict() for job in jobs.jobs()],
+    }
+
+
+@get("/links")
+def list_links(db):
+    """Return point to point link reports, filtered by query parameters.
+
+    max_margin, max_path_loss and min_power filter on the fade margin (dB),
+    computed path loss (dB) and received power (dBm). Links are ordered by
+    ascending margin, then path loss.
+    """
+    limits = {}
+    for name in ["max_margin", "max_path_loss", "min_power", "limit"]:
+        if request.query.get(name):
+            try:
+                limits[name] = float(request.query.get(name))
+            except ValueError:
+                abort(400, f"{name} must be a number.")
+    query = db.query(LinkReport)
+    if "max_margin" in limits:
+        query = query.filter(LinkReport.margin <= limits["max_margin"])
+    if "max_path_loss" in limits:
+        query = query.filter(LinkReport.computed_path_loss <= limits["max_path_loss"])
+    if "min_power" in limits:
+        query = query.filter(LinkReport.power_level_at_rx >= limits["min_power"])
+    query = query.order_by(
+        LinkReport.margin.is_(None),
+        LinkReport.margin,
+        LinkReport.computed_path_loss,
+    )
+    if "limit" in limits:
+        query = query.limit(int(limits["limit"]))
+    return {"links": [link.to_dict() for link in query.all()]}
+
+
+def station_matrix(db):
+    """Return the link matrix and selected pairs for a stations matrix request.
+
+    frequency (MHz) is required. max_distance (km), max_path_loss (dB) and
+    limit restrict the pairs, which are ordered by ascending path loss.
+    """
+    limits = {}
+    for name in ["frequency", "max_distance", "max_path_loss", "limit"]:
+        if request.query.get(name):
+            try:
+                limits[name] = float(request.query.get(name))
+            except ValueError:
+                abort(400, f"{name} must be a number.")
+    if not 20 <= limits.get("frequency", 0) <= 100000:
+        abort(400, "frequency must be between 20 and 100000 MHz.")
+    matrix = link_matrix(db, limits["frequency"])
+    pairs = matrix.select(
+        limits.get("max_distance"),
+        limits.get("max_path_loss"),
+        int(limits["limit"]) if "limit" in limits else None,
+    )
+    return matrix, pairs
+
+
+@get("/stations/matrix")
+def get_station_matrix(db):
+    """Return distance, azimuths and free space path loss of station pairs."""
+    matrix, pairs = station_matrix(db)
+    return matrix.to_dict(pairs)
+
+
+@get("/stations/matrix.csv")
+def get_station_matrix_csv(db):
+    """Download the station link matrix as csv."""
+    matrix, pairs = station_matrix(db)
+    response.content_type = "text/csv"
+    response.set_header(
+        "Content-Disposition",
+        f'attachment; filename="link_matrix_{matrix.frequency:g}MHz.csv"',
+    )
+    return matrix.to_csv(pairs)
+
+
+def located_stations(found) -> dict:
+    """Return json friendly stations with their distance and azimuth."""
+    return {
+        "stations": [
+            {
+                "id": station.id,
+                "name": station.name,
+                "latitude": station.latitude,
+                "longitude": station.longitude,
+                "height": station.height,
+                "distance": round(distance, 4),
+                "azimuth": round(azimuth, 2),
+            }
+            for station, distance, azimuth in found
+        ]
+    }
+
+
+def query_numbers(*names: str) -> dict:
+    """Return the named query parameters as floats, aborting if any is invalid."""
+    values = {}
+    for name in names:
+        try:
+            values[name] = float(request.query.get(name))
+        except (TypeError, ValueError):
+            abort(400, f"{name} must be a number.")
+    if not -90 <= values.get("latitude", 0) <= 90:
+        abort(400, "latitude must be between -90 and 90.")
+    if not -180 <= values.get("longitude", 0) <= 180:
+        abort(400, "longitude must be between -180 and 180.")
+    return values
+
+
+@get("/stations/near")
+def stations_near(db):
+    """Return stations within radius km of latitude, longitude by distance."""
+    values = query_numbers("latitude", "longitude", "radius")
+    return located_stations(
+        within(db, values["latitude"], values["longitude"], values["radius"])
+    )
+
+
+@get("/stations/nearest")
+def stations_nearest(db):
+    """Return the count (default 5) stations nearest to latitude, longitude."""
+    values = query_numbers("latitude", "longitude")
+    try:
+        count = int(request.query.get("count") or 5)
+    except ValueError:
+        abort(400, "count must be an integer.")
+    return located_stations(
+        nearest(db, values["latitude"], values["longitude"], max(count, 1))
+    )
+
+
+@get("/metrics")
+def metrics():
+    """Return job and chart renderer metrics."""
+    return {"jobs": jobs.summary(), "renderer": renderer.metrics()}
+
+
+@get("/plot/<id:int>/status")
+def plot_status(id):
+    """Return the status of the latest generation job for the current plot."""
+    job = jobs.get(request.query.job) if request.query.job else None
+    if not job:
+        job = jobs.latest(f"plot:{id}")
+    if job:
+        return job.to_dict()
+    return {"id": None, "key": f"plot:{id}", "status": "idle"}
+
+
+@get("/plot/<id:int>/profile")
+def plot_profile(id, db):
+    """Return the point to point profile series of the current plot.
+
+    Each series is downsampled to at most points samples (default 1000) with
+    Largest-Triangle-Three-Buckets.
+    """
+    item = db.query(Plot).filter_by(id=id).first()
+    if not item or not item.do_p2p_analysis:
+        abort(404, f"Plot {id} has no point to point analysis.")
+    try:
+        points = int(request.query.get("points") or 1000)
+    except ValueError:
+        abort(400, "points must be an integer.")
+    file_base = os.path.join(
+        config["signalservergui"]["output_dir"], str(item.id), item.name
+    )
+    try:
+        series = downsampled(file_base, min(max(points, 3), 10000))
+    except OSError:
+        abort(404, f"Plot {id} has not been generated.")
+    return {
+        "id": item.id,
+        "name": item.name,
+        "units": {
+            "distance": "km" if item.use_metric_units else "mi",
+            "height": "m" if item.use_metric_units else "ft",
+        },
+        "series": series,
+    }
+
+
+@get("/plot/<id:int>/signal")
+@post("/plot/<id:int>/signal")
+def plot_signal(id, db):
+    """Return the signal level of the current plot at one or more points.
+
+    Points are given as repeated lat and lon query parameters, or for large
+    batches as a json body {"points": [[lat, lon], ...]}.
+    """
+    item = db.query(Plot).filter_by(id=id).first()
+    if not item:
+        abort(404, f"Plot {id} does not exist.")
+    try:
+        # Read the body directly, request.json refuses bodies over 100kB.
+        if request.method == "POST" and "json" in request.content_type:
+            points = np.array(json.load(request.body)["points"], dtype=float)
+            points = points.reshape(-1, 2)
+        else:
+            points = np.column_stack(
+                [
+                    np.array(request.query.getall("lat"), dtype=float),
+                    np.array(request.query.getall("lon"), dtype=float),
+                ]
+            )
+    except (KeyError, TypeError, ValueError):
+        abort(400, "Points must be pairs of numeric lat and lon values.")
+    if not len(points):
+        abort(400, "lat and lon are required.")
+    file_base = os.path.join(
+        config["signalservergui"]["output_dir"], str(item.id), item.name
+    )
+    try:
+        raster = PlotRaster.from_plot(
+            file_base, config["signalserver"]["color_profile"], item.use_dbm
+        )
+    except Exception as e:
+        abort(404, f"Plot {id} has not been generated. {e}")
+    return {"id": item.id, "points": raster.query(points[:, 0], points[:, 1])}
+
+
+@get("/plot/<id:int>/interference")
+def plot_interference(id, db):
+    """Queue the C/I map of the current plot against the plots listed in plots.
+
+    plots is a comma separated list of interfering plot ids, which must share
+    the current plot's frequency. The response carries the map's name, which
+    /interference/<name> reports the progress of.
+    """
+    item = db.query(Plot).filter_by(id=id).first()
+    if not item:
+        abort(404, f"Plot {id} does not exist.")
+    interferer_ids = [plot_id for plot_id in query_plot_ids(db) if plot_id != id]
+    if not interferer_ids:
+        abort(400, "plots must list at least one other plot.")
+    interferers = db.query(Plot).filter(Plot.id.in_(interferer_ids))
+    others = [other.id for other in interferers if other.frequency != item.frequency]
+    if others:
+        abort(400, f"Plots {others} are not on {item.frequency} MHz.")
+    jobs.submit_interference(id, interferer_ids)
+    return dict(
+        interference_status(interference_name(id, interferer_ids)),
+        serving=id,
+        interferers=interferer_ids,
+    )
+
+
+@get("/plot/<id:int>/diff")
+def plot_diff(id, db):
+    """Queue the comparison of the current plot's coverage with baseline's.
+
+    baseline is the id of the plot to compare against. The response carries
+    the comparison's name, which /diff/<name> reports the progress of.
+    """
+    try:
+        baseline_id = int(request.query.baseline)
+    except ValueError:
+        abort(400, "baseline must be a plot id.")
+    if baseline_id == id:
+        abort(400, "baseline must be another plot.")
+    for plot_id in [baseline_id, id]:
+        if not db.query(Plot).filter_by(id=plot_id).first():
+            abort(404, f"Plot {plot_id} does not exist.")
+    jobs.submit_diff(baseline_id, id)
+    return dict(diff_status(diff_name(baseline_id, id)), baseline=baseline_id, plot=id)
+
+
+@get("/plot/<id:int>/tiles/<z:int>/<x:int>/<y:int>.png")
+def plot_tile(id, z, x, y):
+    """Serve a web mercator tile of the current plot's image.
+
+    Fully transparent tiles are never written, so they are 404s.
+    """
+    root = os.path.join(config["signalservergui"]["output_dir"], str(id), "tiles")
+    return static_file(f"{z}/{x}/{y}.png", root=root)
+
+
 @get("/plot/<id:int>/files")
 def plot_files(id, db):
     """Show available file for the current plot."""
@@ -199,6 +615,7 @@ def plot_files(id, db):
                 ),
             )
             for file in glob.glob(f"downloads/{item.id}/*")
+            if os.path.isfile(file)
         ]
         grouped_files = {
             "Analysis Report": [],
@@ -209,7 +626,7 @@ def plot_files(id, db):
         }
         for file in files:
             if re.match(
-                r".+(\.txt|\.json|_curvature|_fresnel|_fresnel60|_profile|_reference)$",
+                r".+(\.txt|\.json|\.npz|_curvature|_fresnel|_fresnel60|_profile|_reference)$",
                 file[0],
             ):
                 grouped_files["Analysis Report"].append(file)
@@ -222,13 +639,20 @@ def plot_files(id, db):
             else:
                 grouped_files["Other"].append(file)
         # print("File Count:", len(files))
-        if len(files) == 0:
+        job = jobs.latest(f"plot:{item.id}")
+        if len(files) == 0 and job is None:
             redirect(f"/plot/{id}/generate")
         parts = {
             "type": "plot",
             "item": item,
-            "files": grouped_files,
+            "files": grouped_files if len(files) else {},
             "image_type": config["convert"]["output_type"],
+            "job": job,
+            "tiles": load_tiles(
+                os.path.join(
+                    config["signalservergui"]["output_dir"], str(item.id), "tiles"
+                )
+            ),
         }
         return template("files.html", parts)
     else:
@@ -509,6 +933,14 @@ def view_item(item_type, id, db):
         redirect("/")
     item = q.first()
     parts = {"type": item_type, "item": item}
+    if item_type == "plot" and item:
+        parts["coverage"] = load_coverage_stats(
+            os.path.join(
+                config["signalservergui"]["output_dir"],
+                str(item.id),
+                f"{item.name}_coverage.json",
+            )
+        )
     return template("view.html", parts)
 
 
@@ -527,15 +959,17 @@ def get_config():
             config["signalserver"]["path"],
             True if utils.which(config["signalserver"]["path"]) else False,
         ),
-        "signalserver": (
-            config["signalserver"]["path"],
+        "signalserverHD": (
+            config["signalserver"]["path"] + "HD",
             True if utils.which(config["signalserver"]["path"] + "HD") else False,
         ),
-        "convert": (
-            config["convert"]["path"],
-            True if utils.which(config["convert"]["path"]) else False,
-        ),
     }
+    # convert is only needed for image types other than png.
+    if config["convert"]["output_type"] != "png":
+        tools["convert"] = (
+            config["convert"].get("path", ""),
+            True if utils.which(config["convert"].get("path", "")) else False,
+        )
     parts = {
         "title": "Config",
         "config": config,
@@ -582,13 +1016,20 @@ if __name__ == "__main__":
                 )
             elif "convert" not in config:
                 raise (Exception("Missing required 'convert' section in config."))
-            elif "path" not in config["convert"]:
+            elif (
+                config["convert"].get("output_type", "png") != "png"
+                and "path" not in config["convert"]
+            ):
                 raise (
                     Exception(
                         "Missing required 'path' value in 'convert' section of config."
                     )
                 )
 
+            if "output_type" not in config["convert"]:
+                config["convert"]["output_type"] = "png"
+            if "cache_dir" not in config["signalservergui"]:
+                config["signalservergui"]["cache_dir"] = "cache"
             if "antenna_profiles_dir" not in config["signalserver"]:
                 config["signalserver"]["antenna_profiles_dir"] = os.path.join(
                     config["signalservergui"]["data_dir"], "antennas"
@@ -636,4 +1077,14 @@ if __name__ == "__main__":
         use_kwargs=False,
     )
     install(plugin)
+    jobs = JobQueue(
+        config,
+        engine,
+        workers=config["signalservergui"].getint("workers", 0),
+        hd_workers=config["signalservergui"].getint("hd_workers", 1),
+    )
+    # Warm up the chart renderer in the process that serves requests, rather
+    # than in the reloader's file watcher.
+    if os.environ.get("BOTTLE_CHILD"):
+        renderer.start()
     run(host="localhost", port=8080, reloader=True, debug=True)
@@ -4,51 +4,39 @@ from typing import Union
 from .site import Site
 from .propagation_model import PropagationModel
 from .link import Link
+from .parser import ReportParser
 
 
 class AnalysisReport:
-    """The AnalysisReport class."""
+    """The AnalysisReport class.
+
+    Reports serialize to a dict tagged with the schema version, which
+    from_dict checks before rebuilding the report. Unversioned json written
+    by earlier releases, whose keys carry a leading underscore, is still
+    accepted.
+    """
+
+    version = 1
+
+    __slots__ = ("transmitter", "receiver", "model", "link")
 
     def __init__(
         self, transmitter: Site, receiver: Site, model: PropagationModel, link: Link
     ) -> None:
         """Initialize a new AnalysisReport instance."""
-        self._transmitter = transmitter
-        self._receiver = receiver
-        self._model = model
-        self._link = link
-
-    @property
-    def transmitter(self) -> Site:
-        """Getter for transmitter property."""
-        return self._transmitter
-
-    @property
-    def receiver(self) -> Site:
-        """Getter for receiver property."""
-        return self._receiver
-
-    @property
-    def model(self) -> PropagationModel:
-        """Getter for model property."""
-        return self._model
-
-    @property
-    def link(self) -> Link:
-        """Getter for link property."""
-        return self._link
+        self.transmitter = transmitter
+        self.receiver = receiver
+        self.model = model
+        self.link = link
 
     @classmethod
     def from_file(cls, report_filename: str):
         """Parse an analysis report file and extract all details.
 
-        AnalysisReport instance factory method.
+        AnalysisReport instance factory method. The file is read once, unlike
+        the section factory methods of Site, PropagationModel and Link.
         """
-        transmitter = Site.from_file(report_filename, "tx")
-        receiver = Site.from_file(report_filename, "rx")
-        model = PropagationModel.from_file(report_filename)
-        link = Link.from_file(report_filename)
-        return AnalysisReport(transmitter, receiver, model, link)
+        return ReportParser.parse_file(report_filename)
 
     def __str__(self):
         """Return a human readable string representation of a AnalysisReport instance."""
@@ -65,6 +53,59 @@ Analysis Report:
 """
         return report_string
 
-    def to_json(self):
-        """Return AnalysisReport in json."""
-        return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True, indent=4)
+    def to_dict(self) -> dict:
+        """Return the report as a json serializable dict."""
+        return {
+            "version": self.version,
+            "transmitter": self.transmitter.to_dict(),
+            "receiver": self.receiver.to_dict(),
+            "model": self.model.to_dict(),
+            "link": self.link.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create a new AnalysisReport object from the output of to_dict."""
+        if "version" not in data:
+            data = _strip_underscores(data)
+        elif data["version"] != cls.version:
+            raise (
+                Exception(f"{data['version']} - Unsupported analysis report version.")
+            )
+        return cls(
+            Site.from_dict(data["transmitter"]),
+            Site.from_dict(data["receiver"]),
+            PropagationModel.from_dict(data["model"]),
+            Link.from_dict(data["link"]),
+        )
+
+    def to_json(self, compact: bool = False) -> str:
+        """Return AnalysisReport in json.
+
+        Compact json omits indentation and whitespace between items.
+        """
+        if compact:
+            return json.dumps(self.to_dict(), separators=(",", ":"))
+        return json.dumps(self.to_dict(), indent=4)
+
+    @classmethod
+    def from_json(cls, report_json: str):
+        """Create a new AnalysisReport object from the output of to_json."""
+        return cls.from_dict(json.loads(report_json))
+
+    @classmethod
+    def load(cls, json_filename: str):
+        """Load an AnalysisReport from a json file written with to_json."""
+        with open(json_filename, "rb") as f:
+            return cls.from_dict(json.load(f))
+
+
+def _strip_underscores(data):
+    """Return unversioned report json with its private key prefixes removed."""
+    if isinstance(data, dict):
+        return {
+            key.lstrip("_"): _strip_underscores(value) for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [_strip_underscores(value) for value in data]
+    return data
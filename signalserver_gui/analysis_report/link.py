@@ -6,6 +6,23 @@ from .obstruction import Obstruction
 class Link:
     """The AnalysisReport Link class."""
 
+    __slots__ = (
+        "free_space_path_loss",
+        "computed_path_loss",
+        "terrain_shielding_attenuation",
+        "field_strength_at_rx",
+        "power_level_at_rx",
+        "power_density_at_rx",
+        "voltage_50ohm_dipole",
+        "voltage_75ohm_dipole",
+        "longley_rice_errors",
+        "rx_adjustment_to_clear_obstructions",
+        "rx_adjustment_to_clear_first_fresnel_zone",
+        "rx_adjustment_to_clear_first_fresnel_zone60",
+        "obstructions",
+        "use_metric",
+    )
+
     units = {
         "distance": {
             "imperial": [("ft", "foot", "feet"), ("mi", "mile", "miles")],
@@ -27,9 +44,9 @@ class Link:
         rx_adjustment_to_clear_obstructions: float = 0.0,
         rx_adjustment_to_clear_first_fresnel_zone: float = 0.0,
         rx_adjustment_to_clear_first_fresnel_zone60: float = 0.0,
-        obstructions: List[Obstruction] = [],
-        use_metric=False,
-    ):
+        obstructions: List[Obstruction] = None,
+        use_metric: bool = False,
+    ) -> None:
         """Initialize a new AnalysisReport Link instance."""
         self.free_space_path_loss = free_space_path_loss
         self.computed_path_loss = computed_path_loss
@@ -47,126 +64,8 @@ class Link:
         self.rx_adjustment_to_clear_first_fresnel_zone60 = (
             rx_adjustment_to_clear_first_fresnel_zone60
         )
-        self._obstructions = obstructions
-        self._use_metric = use_metric
-
-    @property
-    def use_metric(self) -> bool:
-        """Getter/Setter for free_space_path_loss property."""
-        return self._use_metric
-
-    @use_metric.setter
-    def use_metric(self, new_value: bool = True) -> None:
-        self._use_metric = new_value
-
-    @property
-    def free_space_path_loss(self) -> float:
-        """Getter/Setter for free_space_path_loss property."""
-        return self._free_space_path_loss
-
-    @free_space_path_loss.setter
-    def free_space_path_loss(self, new_value: float) -> None:
-        self._free_space_path_loss = new_value
-
-    @property
-    def computed_path_loss(self) -> float:
-        """Getter/Setter for computed_path_loss property."""
-        return self._computed_path_loss
-
-    @computed_path_loss.setter
-    def computed_path_loss(self, new_value: float) -> None:
-        self._computed_path_loss = new_value
-
-    @property
-    def terrain_shielding_attenuation(self) -> float:
-        """Getter/Setter for terrain_shielding_attenuation property."""
-        return self._terrain_shielding_attenuation
-
-    @terrain_shielding_attenuation.setter
-    def terrain_shielding_attenuation(self, new_value: float) -> None:
-        self._terrain_shielding_attenuation = new_value
-
-    @property
-    def power_level_at_rx(self) -> float:
-        """Getter/Setter for power_level_at_rx property."""
-        return self._power_level_at_rx
-
-    @power_level_at_rx.setter
-    def power_level_at_rx(self, new_value: float) -> None:
-        self._power_level_at_rx = new_value
-
-    @property
-    def power_density_at_rx(self) -> float:
-        """Getter/Setter for power_density_at_rx property."""
-        return self._power_density_at_rx
-
-    @power_density_at_rx.setter
-    def power_density_at_rx(self, new_value: float) -> None:
-        self._power_density_at_rx = new_value
-
-    @property
-    def voltage_50ohm_dipole(self) -> float:
-        """Getter/Setter for voltage_50ohm_dipole property."""
-        return self._voltage_50ohm_dipole
-
-    @voltage_50ohm_dipole.setter
-    def voltage_50ohm_dipole(self, new_value: float) -> None:
-        self._voltage_50ohm_dipole = new_value
-
-    @property
-    def voltage_75ohm_dipole(self) -> float:
-        """Getter/Setter for voltage_75ohm_dipole property."""
-        return self._voltage_75ohm_dipole
-
-    @voltage_75ohm_dipole.setter
-    def voltage_75ohm_dipole(self, new_value: float) -> None:
-        self._voltage_75ohm_dipole = new_value
-
-    @property
-    def longley_rice_errors(self) -> int:
-        """Getter/Setter for longley_rice_errors property."""
-        return self._longley_rice_errors
-
-    @longley_rice_errors.setter
-    def longley_rice_errors(self, new_value: int) -> None:
-        self._longley_rice_errors = new_value
-
-    @property
-    def rx_adjustment_to_clear_obstructions(self) -> float:
-        """Getter/Setter for rx_adjustment_to_clear_obstructions property."""
-        return self._rx_adjustment_to_clear_obstructions
-
-    @rx_adjustment_to_clear_obstructions.setter
-    def rx_adjustment_to_clear_obstructions(self, new_value: float) -> None:
-        self._rx_adjustment_to_clear_obstructions = new_value
-
-    @property
-    def rx_adjustment_to_clear_first_fresnel_zone(self) -> float:
-        """Getter/Setter for rx_adjustment_to_clear_first_fresnel_zone property."""
-        return self._rx_adjustment_to_clear_first_fresnel_zone
-
-    @rx_adjustment_to_clear_first_fresnel_zone.setter
-    def rx_adjustment_to_clear_first_fresnel_zone(self, new_value: float) -> None:
-        self._rx_adjustment_to_clear_first_fresnel_zone = new_value
-
-    @property
-    def rx_adjustment_to_clear_first_fresnel_zone60(self) -> float:
-        """Getter/Setter for rx_adjustment_to_clear_first_fresnel_zone60 property."""
-        return self._rx_adjustment_to_clear_first_fresnel_zone60
-
-    @rx_adjustment_to_clear_first_fresnel_zone60.setter
-    def rx_adjustment_to_clear_first_fresnel_zone60(self, new_value: float) -> None:
-        self._rx_adjustment_to_clear_first_fresnel_zone60 = new_value
-
-    @property
-    def obstructions(self) -> List[Obstruction]:
-        """Getter for obstructions property."""
-        return self._obstructions
-
-    @obstructions.setter
-    def obstructions(self, obstructions: List[Obstruction]) -> None:
-        """Setter for obstructions property."""
-        self._obstructions = obstructions
+        self.obstructions = obstructions if obstructions is not None else []
+        self.use_metric = use_metric
 
     def add_obstruction(self, new_item: Obstruction) -> None:
         """Add a new obstruction to the obstruction list."""
@@ -267,6 +166,21 @@ class Link:
         except Exception as e:
             raise (Exception(f"A problem occurred while parsing report file. {e}"))
 
+    def to_dict(self) -> dict:
+        """Return the link as a json serializable dict."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["obstructions"] = [obs.to_dict() for obs in self.obstructions]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create a new Link object from the output of to_dict."""
+        values = {name: data[name] for name in cls.__slots__}
+        values["obstructions"] = [
+            Obstruction.from_dict(obs) for obs in data["obstructions"]
+        ]
+        return cls(**values)
+
     def with_units(self, value: float, abbr: bool = True, large: bool = False) -> str:
         """Convert a distance number to a string with units."""
         type = "metric" if self.use_metric else "imperial"
@@ -2,7 +2,13 @@
 
 
 class Obstruction:
-    """The AnalysisReport Link Obstruction class."""
+    """The AnalysisReport Link Obstruction class.
+
+    Reports of long links can list hundreds of obstructions, so instances are
+    slotted records without a per-instance __dict__.
+    """
+
+    __slots__ = ("longitude", "latitude", "distance", "height", "metric")
 
     units = {
         "distance": {
@@ -26,65 +32,41 @@ class Obstruction:
         self.height = height
         self.metric = metric
 
-    @property
-    def metric(self) -> bool:
-        """Getter/Setter for free_space_path_loss property."""
-        return self._metric
-
-    @metric.setter
-    def metric(self, new_value: bool = True) -> None:
-        self._metric = new_value
-
-    @property
-    def longitude(self) -> float:
-        """Getter/Setter for longitude property."""
-        return self._longitude
-
-    @longitude.setter
-    def longitude(self, new_value: float) -> None:
-        self._longitude = new_value
-
-    @property
-    def latitude(self) -> float:
-        """Getter/Setter for latitude property."""
-        return self._latitude
-
-    @latitude.setter
-    def latitude(self, new_value: float) -> None:
-        self._latitude = new_value
-
-    @property
-    def distance(self) -> float:
-        """Getter/Setter for distance property."""
-        return self._distance
-
-    @distance.setter
-    def distance(self, new_value: float) -> None:
-        self._distance = new_value
-
-    @property
-    def height(self) -> float:
-        """Getter/Setter for height property."""
-        return self._height
-
-    @height.setter
-    def height(self, new_value: float) -> None:
-        self._height = new_value
-
     @property
     def metric_height(self) -> float:
         """Getter/Setter for height property."""
         if self.metric:
-            return self._height
+            return self.height
         else:
-            return self._height / 3.28084
+            return self.height / 3.28084
 
     @metric_height.setter
     def metric_height(self, new_value: float) -> None:
         if self.metric:
-            self._height = new_value
+            self.height = new_value
         else:
-            self._height = new_value * 3.28084
+            self.height = new_value * 3.28084
+
+    def to_dict(self) -> dict:
+        """Return the obstruction as a json serializable dict."""
+        return {
+            "longitude": self.longitude,
+            "latitude": self.latitude,
+            "distance": self.distance,
+            "height": self.height,
+            "metric": self.metric,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create a new Obstruction object from the output of to_dict."""
+        return cls(
+            data["longitude"],
+            data["latitude"],
+            data["distance"],
+            data["height"],
+            data["metric"],
+        )
 
     def with_units(self, value: float, abbr: bool = True, large: bool = False) -> str:
         """Convert a distance number to a string with units."""
@@ -103,7 +85,6 @@ class Obstruction:
 
         Obstruction instance factory method.
         """
-        print(f"New Obstruction: {descriptor}")
         try:
             # 51.5082 N,   0.5014 W, 20.27 miles, 118.11 feet AMSL
             metric = False if "mile" in descriptor else True
@@ -123,7 +104,7 @@ class Obstruction:
             return Obstruction(longitude, latitude, distance, height, metric)
         except Exception as e:
             raise (
-                Exception("Unable to parse obstruction descriptor. {e}\n{descriptor}")
+                Exception(f"Unable to parse obstruction descriptor. {e}\n{descriptor}")
             )
 
     def __str__(self) -> str:
@@ -0,0 +1,186 @@
+"""This module contains the single pass AnalysisReport parser."""
+from typing import Callable, Iterable, List, Tuple
+
+from .link import Link
+from .obstruction import Obstruction
+from .propagation_model import PropagationModel
+from .site import Site
+
+
+def _number(line: str) -> float:
+    """Return the number following the colon of a report line."""
+    return float(line.split(": ", 1)[1].split(" ", 1)[0])
+
+
+def _fraction(line: str) -> float:
+    """Return the percentage following the colon of a report line as a fraction."""
+    return float(line.split(": ", 1)[1].strip("%")) / 100
+
+
+def _text(line: str) -> str:
+    """Return the text following the colon of a report line."""
+    return line.split(": ", 1)[1]
+
+
+def _parenthesized(line: str) -> str:
+    """Return the text inside the parentheses of a report line."""
+    return line.split("(", 1)[1][:-1]
+
+
+def _adjustment(line: str) -> float:
+    """Return the antenna height of an "Antenna at Rx must be raised" line."""
+    return float(line.split("at least ", 1)[1].split(" ", 1)[0])
+
+
+def _obstruction(line: str) -> Obstruction:
+    """Return the Obstruction described by an indented link summary line."""
+    # 51.5082 N,   0.5014 W, 20.27 miles, 118.11 feet AMSL
+    fields = line.split()
+    if len(fields) != 9:
+        return Obstruction.from_string(line)
+    latitude = float(fields[0]) if fields[1][0] == "N" else -float(fields[0])
+    longitude = -float(fields[2]) if fields[3][0] == "W" else float(fields[2])
+    return Obstruction(
+        longitude,
+        latitude,
+        float(fields[4]),
+        float(fields[6]),
+        not fields[5].startswith("mile"),
+    )
+
+
+# Line prefix, attribute and value parser for each section of a report.
+Handlers = List[Tuple[str, str, Callable[[str], object]]]
+SITE_HANDLERS: Handlers = [
+    ("Ground elevation:", "elevation", _number),
+    ("Antenna height:", "height", _number),
+    ("Distance to", "distance", _number),
+    ("Azimuth to", "azimuth", _number),
+    ("Downtilt angle to", "downtilt", _number),
+]
+MODEL_HANDLERS: Handlers = [
+    ("Propagation model:", "model", _text),
+    ("Model sub-type:", "subtype", _text),
+    ("Earth's Dielectric Constant:", "dielectric_constant", _number),
+    ("Earth's Conductivity:", "earth_conductivity", _number),
+    ("Atmospheric Bending Constant (N-units):", "atmospheric_bending", _number),
+    ("Frequency:", "frequency", _number),
+    ("Radio Climate:", "radio_climate", _parenthesized),
+    ("Polarization:", "polarization", lambda line: _parenthesized(line).lower()),
+    ("Fraction of Situations:", "fraction_of_situation", _fraction),
+    ("Fraction of Time:", "fraction_of_time", _fraction),
+    ("Receiver gain:", "rx_gain", _number),
+    ("Transmitter ERP plus", "tx_erp_plus_rx_gain", _number),
+    ("Transmitter ERP minus", "tx_erp_minus_rx_gain", _number),
+    ("Transmitter EIRP plus", "tx_eirp_plus_rx_gain", _number),
+    ("Transmitter EIRP minus", "tx_eirp_minus_rx_gain", _number),
+]
+LINK_HANDLERS: Handlers = [
+    ("Free space path loss:", "free_space_path_loss", _number),
+    ("Computed path loss:", "computed_path_loss", _number),
+    ("Attenuation due to", "terrain_shielding_attenuation", _number),
+    ("Field strength", "field_strength_at_rx", _number),
+    ("Signal power level", "power_level_at_rx", _number),
+    ("Signal power density", "power_density_at_rx", _number),
+    ("Voltage across 50 ohm", "voltage_50ohm_dipole", _number),
+    ("Voltage across 75 ohm", "voltage_75ohm_dipole", _number),
+    ("Longley-Rice model", "longley_rice_errors", lambda line: int(_number(line))),
+]
+# The "Antenna at Rx must be raised" lines appear in this order. A clear line
+# of sight replaces the first one with "No obstructions to LOS path".
+ADJUSTMENTS = [
+    "rx_adjustment_to_clear_obstructions",
+    "rx_adjustment_to_clear_first_fresnel_zone",
+    "rx_adjustment_to_clear_first_fresnel_zone60",
+]
+
+
+class ReportParser:
+    """Build an AnalysisReport from a single pass over a signalserver report.
+
+    Lines are dispatched to the handler of the section they appear in: the
+    transmitter site, the receiver site, the propagation model and the link
+    summary with its obstructions.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a new ReportParser instance."""
+        self.transmitter = Site("tx")
+        self.receiver = Site("rx")
+        self.model = PropagationModel()
+        self.link = Link()
+        self.section = None
+        self.adjustments = 0
+        self.imperial = False
+
+    def feed(self, line: str) -> None:
+        """Parse the next line of a report."""
+        if not self.imperial and "mile" in line:
+            self.imperial = True
+        if self.section == "link" and line.startswith("    "):
+            self.link.obstructions.append(_obstruction(line))
+            return
+        line = line.strip()
+        if line.startswith("Transmitter site:"):
+            self.section = "tx"
+        elif line.startswith("Receiver site:"):
+            self.section = "rx"
+        elif line.startswith("Summary for the link between Tx and Rx:"):
+            self.section = "link"
+        elif self.section in ("tx", "rx"):
+            self.site_line(line)
+        elif self.section == "model":
+            self.dispatch(self.model, MODEL_HANDLERS, line)
+        elif self.section == "link":
+            self.link_line(line)
+
+    def site_line(self, line: str) -> None:
+        """Parse a line of the transmitter or receiver section."""
+        site = self.transmitter if self.section == "tx" else self.receiver
+        if line.startswith("Site location:"):
+            site.latitude, site.longitude = map(float, _text(line).split(", "))
+        elif self.dispatch(site, SITE_HANDLERS, line) == "downtilt":
+            # The propagation model follows the receiver section.
+            self.section = "model" if self.section == "rx" else None
+
+    def link_line(self, line: str) -> None:
+        """Parse a line of the link summary section."""
+        if line.startswith("Antenna at Rx must be raised"):
+            if self.adjustments < len(ADJUSTMENTS):
+                setattr(self.link, ADJUSTMENTS[self.adjustments], _adjustment(line))
+            self.adjustments += 1
+        elif "No obstructions to LOS path" in line:
+            self.adjustments += 1
+        else:
+            self.dispatch(self.link, LINK_HANDLERS, line)
+
+    @staticmethod
+    def dispatch(target: object, handlers: Handlers, line: str) -> str:
+        """Set the attribute of the first handler matching line and return it."""
+        for prefix, attribute, parse in handlers:
+            if line.startswith(prefix):
+                setattr(target, attribute, parse(line))
+                return attribute
+        return None
+
+    def parse(self, lines: Iterable[str]):
+        """Parse all lines of a report and return the resulting AnalysisReport."""
+        from .analysis_report import AnalysisReport
+
+        try:
+            for line in lines:
+                self.feed(line)
+        except Exception as e:
+            raise (Exception(f"A problem occurred while parsing report file. {e}"))
+        # Distances are reported in miles unless signalserver ran metric.
+        metric = not self.imperial
+        self.transmitter.metric = metric
+        self.receiver.metric = metric
+        self.link.use_metric = metric
+        return AnalysisReport(self.transmitter, self.receiver, self.model, self.link)
+
+    @classmethod
+    def parse_file(cls, report_filename: str):
+        """Parse a report file, reading it exactly once."""
+        with open(report_filename) as report:
+            return cls().parse(report)
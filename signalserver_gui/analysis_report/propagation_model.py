@@ -4,6 +4,24 @@
 class PropagationModel:
     """The AnalysisReport PropagationModel class."""
 
+    __slots__ = (
+        "model",
+        "subtype",
+        "dielectric_constant",
+        "earth_conductivity",
+        "atmospheric_bending",
+        "frequency",
+        "radio_climate",
+        "polarization",
+        "fraction_of_situation",
+        "fraction_of_time",
+        "rx_gain",
+        "tx_erp_plus_rx_gain",
+        "tx_erp_minus_rx_gain",
+        "tx_eirp_plus_rx_gain",
+        "tx_eirp_minus_rx_gain",
+    )
+
     def __init__(
         self,
         model: str = "",
@@ -21,7 +39,7 @@ class PropagationModel:
         tx_erp_minus_rx_gain: float = 0.0,
         tx_eirp_plus_rx_gain: float = 0.0,
         tx_eirp_minus_rx_gain: float = 0.0,
-    ):
+    ) -> None:
         """Initialize a new PropagationModel instance."""
         self.model = model
         self.subtype = subtype
@@ -39,140 +57,17 @@ class PropagationModel:
         self.tx_eirp_plus_rx_gain = tx_eirp_plus_rx_gain
         self.tx_eirp_minus_rx_gain = tx_eirp_minus_rx_gain
 
-    @property
-    def model(self) -> str:
-        """Getter/Setter for model property."""
-        return self._model
-
-    @model.setter
-    def model(self, new_value: str) -> None:
-        self._model = new_value
-
-    @property
-    def subtype(self) -> str:
-        """Getter/Setter for site property."""
-        return self._subtype
-
-    @subtype.setter
-    def subtype(self, new_value: str) -> None:
-        self._subtype = new_value
-
-    @property
-    def dielectric_constant(self) -> float:
-        """Getter/Setter for dielectric_constant property."""
-        return self._dielectric_constant
-
-    @dielectric_constant.setter
-    def dielectric_constant(self, new_value: float) -> None:
-        self._dielectric_constant = new_value
-
-    @property
-    def earth_conductivity(self) -> float:
-        """Getter/Setter for earth_conductivity property."""
-        return self._earth_conductivity
-
-    @earth_conductivity.setter
-    def earth_conductivity(self, new_value: float) -> None:
-        self._earth_conductivity = new_value
-
-    @property
-    def atmospheric_bending(self) -> float:
-        """Getter/Setter for atmospheric_bending property."""
-        return self._atmospheric_bending
-
-    @atmospheric_bending.setter
-    def atmospheric_bending(self, new_value: float) -> None:
-        self._atmospheric_bending = new_value
-
-    @property
-    def frequency(self) -> float:
-        """Getter/Setter for frequency property."""
-        return self._frequency
-
-    @frequency.setter
-    def frequency(self, new_value: float) -> None:
-        self._frequency = new_value
-
-    @property
-    def radio_climate(self) -> str:
-        """Getter/Setter for radio_climate property."""
-        return self._radio_climate
-
-    @radio_climate.setter
-    def radio_climate(self, new_value: str) -> None:
-        self._radio_climate = new_value
-
-    @property
-    def polarization(self) -> str:
-        """Getter/Setter for polarization property."""
-        return self._polarization
+    def to_dict(self) -> dict:
+        """Return the propagation model as a json serializable dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
 
-    @polarization.setter
-    def polarization(self, new_value: str) -> None:
-        self._polarization = new_value
-
-    @property
-    def fraction_of_situation(self) -> float:
-        """Getter/Setter for fraction_of_situation property."""
-        return self._fraction_of_situation
-
-    @fraction_of_situation.setter
-    def fraction_of_situation(self, new_value: float) -> None:
-        self._fraction_of_situation = new_value
-
-    @property
-    def fraction_of_time(self) -> float:
-        """Getter/Setter for fraction_of_time property."""
-        return self._fraction_of_time
-
-    @fraction_of_time.setter
-    def fraction_of_time(self, new_value: float) -> None:
-        self._fraction_of_time = new_value
-
-    @property
-    def rx_gain(self) -> float:
-        """Getter/Setter for rx_gain property."""
-        return self._rx_gain
-
-    @rx_gain.setter
-    def rx_gain(self, new_value: float) -> None:
-        self._rx_gain = new_value
-
-    @property
-    def tx_erp_plus_rx_gain(self) -> float:
-        """Getter/Setter for tx_erp_plus_rx_gain property."""
-        return self._tx_erp_plus_rx_gain
-
-    @tx_erp_plus_rx_gain.setter
-    def tx_erp_plus_rx_gain(self, new_value: float) -> None:
-        self._tx_erp_plus_rx_gain = new_value
-
-    @property
-    def tx_erp_minus_rx_gain(self) -> float:
-        """Getter/Setter for tx_erp_minus_rx_gain property."""
-        return self._tx_erp_minus_rx_gain
-
-    @tx_erp_minus_rx_gain.setter
-    def tx_erp_minus_rx_gain(self, new_value: float) -> None:
-        self._tx_erp_minus_rx_gain = new_value
-
-    @property
-    def tx_eirp_plus_rx_gain(self) -> float:
-        """Getter/Setter for tx_eirp_plus_rx_gain property."""
-        return self._tx_eirp_plus_rx_gain
-
-    @tx_eirp_plus_rx_gain.setter
-    def tx_eirp_plus_rx_gain(self, new_value: float) -> None:
-        self._tx_eirp_plus_rx_gain = new_value
-
-    @property
-    def tx_eirp_minus_rx_gain(self) -> float:
-        """Getter/Setter for tx_eirp_minus_rx_gain property."""
-        return self._tx_eirp_minus_rx_gain
-
-    @tx_eirp_minus_rx_gain.setter
-    def tx_eirp_minus_rx_gain(self, new_value: float) -> None:
-        self._tx_eirp_minus_rx_gain = new_value
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create a new PropagationModel object from the output of to_dict."""
+        new_model = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(new_model, name, data[name])
+        return new_model
 
     @classmethod
     def from_file(cls, report_filename: str):
@@ -5,6 +5,18 @@ from typing import Union
 class Site:
     """The AnalysisReport Site class."""
 
+    __slots__ = (
+        "site",
+        "longitude",
+        "latitude",
+        "elevation",
+        "height",
+        "distance",
+        "azimuth",
+        "downtilt",
+        "metric",
+    )
+
     units = {
         "distance": {
             "imperial": [("ft", "foot", "feet"), ("mi", "mile", "miles")],
@@ -14,16 +26,16 @@ class Site:
 
     def __init__(
         self,
-        site,
-        longitude=0.0,
-        latitude=0.0,
-        elevation=0.0,
-        height=0.0,
-        distance=0.0,
-        azimuth=0.0,
-        downtilt=0.0,
-        metric=False,
-    ):
+        site: str,
+        longitude: float = 0.0,
+        latitude: float = 0.0,
+        elevation: float = 0.0,
+        height: float = 0.0,
+        distance: float = 0.0,
+        azimuth: float = 0.0,
+        downtilt: float = 0.0,
+        metric: bool = False,
+    ) -> None:
         """Initialize a new Site instance."""
         self.site = site
         self.longitude = longitude
@@ -35,116 +47,44 @@ class Site:
         self.downtilt = downtilt
         self.metric = metric
 
-    @property
-    def metric(self) -> bool:
-        """Getter/Setter for free_space_path_loss property."""
-        return self._metric
-
-    @metric.setter
-    def metric(self, new_value: bool = True) -> None:
-        self._metric = new_value
-
-    @property
-    def site(self) -> str:
-        """Getter/Setter for site property."""
-        return self._site
-
-    @site.setter
-    def site(self, new_value: str) -> None:
-        self._site = new_value
-
-    @property
-    def longitude(self) -> float:
-        """Getter/Setter for longitude property."""
-        return self._longitude
-
-    @longitude.setter
-    def longitude(self, new_value: float) -> None:
-        self._longitude = new_value
-
-    @property
-    def latitude(self) -> float:
-        """Getter/Setter for latitude property."""
-        return self._latitude
-
-    @latitude.setter
-    def latitude(self, new_value: float) -> None:
-        self._latitude = new_value
-
-    @property
-    def elevation(self) -> float:
-        """Getter/Setter for elevation property."""
-        return self._elevation
-
-    @elevation.setter
-    def elevation(self, new_value: float) -> None:
-        self._elevation = new_value
-
     @property
     def metric_elevation(self) -> float:
         """Getter/Setter for metric elevation property."""
         if self.metric:
-            return self._elevation
+            return self.elevation
         else:
-            return self._elevation / 3.28084
+            return self.elevation / 3.28084
 
     @metric_elevation.setter
     def metric_elevation(self, new_value: float) -> None:
         if self.metric:
-            self._elevation = new_value
+            self.elevation = new_value
         else:
-            self._elevation = new_value * 3.28084
-
-    @property
-    def height(self) -> float:
-        """Getter/Setter for height property."""
-        return self._height
-
-    @height.setter
-    def height(self, new_value: float) -> None:
-        self._height = new_value
+            self.elevation = new_value * 3.28084
 
     @property
     def metric_height(self) -> float:
         """Getter/Setter for height property."""
         if self.metric:
-            return self._height
+            return self.height
         else:
-            return self._height / 3.28084
+            return self.height / 3.28084
 
     @metric_height.setter
     def metric_height(self, new_value: float) -> None:
         if self.metric:
-            self._height = new_value
+            self.height = new_value
         else:
-            self._height = new_value * 3.28084
-
-    @property
-    def distance(self) -> float:
-        """Getter/Setter for distance property."""
-        return self._distance
-
-    @distance.setter
-    def distance(self, new_value: float) -> None:
-        self._distance = new_value
-
-    @property
-    def azimuth(self) -> float:
-        """Getter/Setter for azimuth property."""
-        return self._azimuth
+            self.height = new_value * 3.28084
 
-    @azimuth.setter
-    def azimuth(self, new_value: float) -> None:
-        self._azimuth = new_value
+    def to_dict(self) -> dict:
+        """Return the site as a json serializable dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
 
-    @property
-    def downtilt(self) -> float:
-        """Getter/Setter for downtilt property."""
-        return self._downtilt
-
-    @downtilt.setter
-    def downtilt(self, new_value: float) -> None:
-        self._downtilt = new_value
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create a new Site object from the output of to_dict."""
+        return cls(**{name: data[name] for name in cls.__slots__})
 
     def with_units(self, value: float, abbr: bool = True, large: bool = False) -> str:
         """Convert a distance number to a string with units."""
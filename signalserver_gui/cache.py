@@ -0,0 +1,139 @@
+"""This module contains the content addressed signalserver result cache."""
+import glob
+import hashlib
+import os
+import shutil
+import threading
+from typing import List, Optional
+
+# Flags whose value is a data directory or file read by signalserver.
+DATA_FLAGS = ["-sdf", "-lid", "-udt", "-clt"]
+
+
+def file_checksum(filename: str) -> str:
+    """Return the sha256 checksum of a file, or an empty string if missing."""
+    if not os.path.isfile(filename):
+        return ""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def path_fingerprint(path: str) -> str:
+    """Return a cheap fingerprint of a file or directory tree.
+
+    Terrain directories can hold gigabytes of tiles, so only file names,
+    sizes and modification times are hashed rather than their contents.
+    """
+    digest = hashlib.sha256()
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = sorted(glob.glob(os.path.join(path, "**", "*"), recursive=True))
+    for name in paths:
+        if os.path.isfile(name):
+            stat = os.stat(name)
+            digest.update(f"{name}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def run_key(command: str, args: List[str], files: List[str] = []) -> str:
+    """Return the key identifying the results of a signalserver invocation.
+
+    The key covers the command, the argument list with the output base
+    name removed, the checksums of the antenna pattern files and any extra
+    files, and fingerprints of the terrain data referenced by the args.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{os.path.basename(command)}|{path_fingerprint(command)}\n".encode())
+    args = list(args)
+    for i, arg in enumerate(args[:-1]):
+        value = args[i + 1]
+        if arg == "-o":
+            args[i + 1] = ""
+        elif arg == "-ant":
+            for ext in [".az", ".el"]:
+                digest.update(f"{ext}|{file_checksum(value + ext)}\n".encode())
+        elif arg in DATA_FLAGS:
+            digest.update(f"{arg}|{path_fingerprint(value)}\n".encode())
+    digest.update("\0".join(args).encode())
+    for filename in files:
+        digest.update(f"\n{filename}|{file_checksum(filename)}".encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Cache signalserver artifacts keyed on everything that produced them.
+
+    Each entry lives in a directory named after its key. Artifacts are stored
+    by their suffix relative to the output base name, so a hit can be linked
+    into any plot's output directory under that plot's name. Linked files
+    are shared by every plot that fetched them, so they must be replaced
+    rather than rewritten in place.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        """Initialize a new ResultCache instance."""
+        self.cache_dir = cache_dir
+
+    def path(self, key: str) -> str:
+        """Return the directory holding a cache entry."""
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def artifacts(self, key: str) -> List[str]:
+        """Return the suffixes of the artifacts stored under a key."""
+        return sorted(os.listdir(os.path.join(self.path(key), "artifacts")))
+
+    def fetch(self, key: str, file_base: str) -> Optional[str]:
+        """Link cached artifacts into place and return the cached output.
+
+        Returns None if the key is not cached.
+        """
+        entry = self.path(key)
+        output_file = os.path.join(entry, "output")
+        if not os.path.isfile(output_file):
+            return None
+        artifacts = os.path.join(entry, "artifacts")
+        for suffix in os.listdir(artifacts):
+            target = file_base + suffix
+            if os.path.lexists(target):
+                os.remove(target)
+            try:
+                os.link(os.path.join(artifacts, suffix), target)
+            except OSError:
+                shutil.copy2(os.path.join(artifacts, suffix), target)
+        with open(output_file) as f:
+            return f.read()
+
+    def store(self, key: str, file_base: str, artifacts: List[str], output: str):
+        """Save the artifacts and output of a signalserver run."""
+        entry = self.path(key)
+        staging = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.join(staging, "artifacts"), exist_ok=True)
+        for artifact in artifacts:
+            target = os.path.join(staging, "artifacts", artifact[len(file_base) :])
+            try:
+                os.link(artifact, target)
+            except OSError:
+                shutil.copy2(artifact, target)
+        with open(os.path.join(staging, "output"), "w") as f:
+            f.write(output)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another worker stored the same entry first.
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def detach(file_base: str) -> None:
+        """Replace outputs hard linked to the cache with private copies.
+
+        signalserver truncates its output files in place, which would corrupt
+        cache entries that are hard linked to them.
+        """
+        for filename in glob.glob(glob.escape(file_base) + "*"):
+            if os.path.isfile(filename) and os.stat(filename).st_nlink > 1:
+                shutil.copy2(filename, f"{filename}.detach")
+                os.replace(f"{filename}.detach", filename)
@@ -0,0 +1,150 @@
+"""This module contains the signalserver color profile parser and decoder."""
+import functools
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Units of the value each color profile type describes.
+UNITS = {".dcf": "dBm", ".scf": "dBuV/m", ".lcf": "dB"}
+
+
+class ColorProfile:
+    """The bands signalserver paints coverage images with.
+
+    Each line of a color profile maps a threshold to an RGB color. Signal
+    profiles (.dcf, .scf) paint a pixel with the first color whose threshold
+    the signal reaches, so their thresholds descend. Loss profiles (.lcf)
+    paint it with the first color whose threshold the loss does not exceed,
+    so their thresholds ascend.
+
+    The profile is compiled into a table indexed by packed 24 bit color, so
+    whole rasters are decoded with a few vectorized passes. The table takes
+    16MB, so compiled profiles are shared through load.
+    """
+
+    def __init__(
+        self,
+        levels: List[float],
+        colors: List[Tuple[int, int, int]],
+        units: str = "dBm",
+    ) -> None:
+        """Initialize a new ColorProfile instance."""
+        self.levels = levels
+        self.colors = colors
+        self.units = units
+        self.index = {}
+        for i, color in enumerate(colors):
+            # Keep the first band of a color repeated in the profile.
+            self.index.setdefault(tuple(color), i)
+        # One entry per 24 bit color, so decoding is a single gather.
+        self.table = np.full(1 << 24, -1, np.int8 if len(levels) < 128 else np.int16)
+        for color, i in self.index.items():
+            self.table[pack(np.array(color))] = i
+        # The value a pixel of each band stands for: the threshold it reached
+        # for signal, the threshold it did not exceed for loss. The trailing
+        # NaN is picked by pixels without a band.
+        self.values = np.array(list(levels) + [np.nan], dtype=np.float32)
+
+    @property
+    def loss(self) -> bool:
+        """True if the profile's values are path loss rather than signal."""
+        return self.units == "dB"
+
+    def __len__(self) -> int:
+        """Return the number of bands."""
+        return len(self.levels)
+
+    def __repr__(self):
+        """Return a string representation of a ColorProfile instance."""
+        return f"<ColorProfile({len(self)} bands, '{self.units}')>"
+
+    def band(self, i: int) -> Tuple[Optional[float], Optional[float]]:
+        """Return the (min, max) values of band i, None where unbounded."""
+        if self.loss:
+            return (self.levels[i - 1] if i > 0 else None, self.levels[i])
+        return (self.levels[i], self.levels[i - 1] if i > 0 else None)
+
+    def lookup(self, color: Tuple[int, int, int]) -> Optional[int]:
+        """Return the band painted with an RGB color, or None."""
+        return self.index.get(tuple(color))
+
+    def decode(self, pixels: np.ndarray) -> np.ndarray:
+        """Return the band of each RGB pixel of a (..., 3) array, -1 if none."""
+        return self.table[pack(pixels)]
+
+    def decode_values(self, pixels: np.ndarray) -> np.ndarray:
+        """Return the value of each RGB pixel of a (..., 3) array, NaN if none."""
+        return self.values[self.decode(pixels)]
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        """Return the RGB color of the band of each value, white if none.
+
+        This is the inverse of decode_values, and assumes the thresholds are
+        ordered the way signalserver expects.
+        """
+        values = np.asarray(values, dtype=np.float32)
+        levels = np.array(self.levels, dtype=np.float32)
+        if self.loss:
+            band = np.searchsorted(levels, values, side="left")
+        else:
+            # The first band a value reaches follows those it does not reach.
+            band = len(levels) - np.searchsorted(levels[::-1], values, side="right")
+        band[np.isnan(values)] = len(levels)
+        palette = np.array(list(self.colors) + [(255, 255, 255)], dtype=np.uint8)
+        return palette[band]
+
+    def recolor(self, pixels: np.ndarray, profile: "ColorProfile") -> np.ndarray:
+        """Return RGB pixels painted with this profile repainted with profile's.
+
+        Each pixel takes profile's color for the value of its band, so values
+        are quantized to this profile's bands first.
+        """
+        return profile.encode(self.decode_values(pixels))
+
+    @classmethod
+    def from_file(cls, filename: str):
+        """Parse a signalserver .dcf, .scf or .lcf color profile.
+
+        ColorProfile instance factory method.
+        """
+        units = UNITS.get(os.path.splitext(filename)[1].lower(), "dBm")
+        levels = []
+        colors = []
+        with open(filename) as f:
+            for line in f:
+                line = line.split(";", 1)[0].strip()
+                if not line:
+                    continue
+                try:
+                    level, rgb = line.split(":", 1)
+                    colors.append(tuple(int(value) for value in rgb.split(",")))
+                    levels.append(float(level))
+                except ValueError:
+                    raise (
+                        Exception(f"{filename} - Malformed color profile line {line}.")
+                    )
+        return cls(levels, colors, units)
+
+
+def pack(pixels: np.ndarray) -> np.ndarray:
+    """Pack the RGB values of a (..., 3) uint8 array into uint32 keys."""
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    keys = pixels[..., 0].astype(np.uint32) << 16
+    keys |= pixels[..., 1].astype(np.uint32) << 8
+    keys |= pixels[..., 2]
+    return keys
+
+
+@functools.lru_cache(maxsize=8)
+def _load(filename: str, modified: int) -> ColorProfile:
+    """Parse a color profile, cached per modification time."""
+    return ColorProfile.from_file(filename)
+
+
+def load(filename: str) -> ColorProfile:
+    """Return the compiled color profile of a file.
+
+    Profiles are parsed once and reparsed only when the file changes.
+    """
+    return _load(os.path.abspath(filename), os.stat(filename).st_mtime_ns)
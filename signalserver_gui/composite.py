@@ -0,0 +1,166 @@
+"""This module contains the best server composite of several plots."""
+import json
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import simplekml
+
+from . import image
+from .coverage_stats import row_areas
+from .grid import BLOCK_PIXELS, Grid
+from .raster import PlotRaster
+
+# Colors of the servers in best_server.png, reused when there are more.
+SERVER_COLORS = np.array(
+    [
+        (31, 119, 180),
+        (255, 127, 14),
+        (44, 160, 44),
+        (214, 39, 40),
+        (148, 103, 189),
+        (140, 86, 75),
+        (227, 119, 194),
+        (127, 127, 127),
+        (188, 189, 34),
+        (23, 190, 207),
+        (174, 199, 232),
+        (255, 187, 120),
+    ],
+    dtype=np.uint8,
+)
+
+
+def best_server(
+    rasters: List[PlotRaster], grid: Grid, pixels: int = BLOCK_PIXELS
+) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+    """Yield (start, stop, best value, best server) for blocks of grid rows.
+
+    The best server of a cell is the index of the raster with the strongest
+    signal there, or the lowest loss for loss profiles, and -1 where no
+    raster has a value. Only one block of rows is held in memory at a time.
+    """
+    loss = rasters[0].profile.loss
+    for start, stop in grid.blocks(pixels):
+        best = np.full((stop - start, grid.width), np.nan, dtype=np.float32)
+        server = np.full(best.shape, -1, dtype=np.int16)
+        north, south = grid.latitudes(start, stop)[[0, -1]]
+        for i, raster in enumerate(rasters):
+            if raster.south > north or raster.north < south:
+                continue
+            values = grid.sample(raster, start, stop)
+            # Comparisons with NaN are false, so cells without a value keep
+            # their current best.
+            with np.errstate(invalid="ignore"):
+                better = values < best if loss else values > best
+            better |= np.isnan(best) & ~np.isnan(values)
+            best[better] = values[better]
+            server[better] = i
+        yield start, stop, best, server
+
+
+def latlonbox(overlay: simplekml.GroundOverlay, grid: Grid) -> None:
+    """Place a ground overlay on the bounds of a grid."""
+    overlay.latlonbox.north = grid.north
+    overlay.latlonbox.south = grid.south
+    overlay.latlonbox.west = grid.west
+    overlay.latlonbox.east = grid.east - 360 if grid.east > 180 else grid.east
+
+
+def make_composite(
+    names: List[str],
+    rasters: List[PlotRaster],
+    stations: List[Tuple[str, float, float]],
+    path: str,
+    opacity: float = 0.75,
+) -> dict:
+    """Write the best server composite of rasters into the directory path.
+
+    composite.png holds the best signal in the first raster's colors,
+    best_server.png the server of each cell, and composite.kmz both as
+    overlays with a placemark for each (name, latitude, longitude) station.
+    composite.json summarizes the grid and the area each server covers.
+    """
+    units = {raster.profile.units for raster in rasters}
+    if len(units) > 1:
+        raise (Exception(f"Plots {names} mix signal units {sorted(units)}."))
+    os.makedirs(path, exist_ok=True)
+    grid = Grid.union(rasters)
+    profile = rasters[0].profile
+    areas = row_areas(grid)
+    server_areas = np.zeros(len(rasters), dtype=np.float64)
+    # Servers are kept on disk until the signal image is written, so both
+    # images can be streamed from a single pass over the rasters.
+    servers_file = os.path.join(path, "best_server.tmp.npy")
+    servers = np.lib.format.open_memmap(
+        servers_file, mode="w+", dtype=np.int16, shape=(grid.height, grid.width)
+    )
+
+    def signal_blocks():
+        for start, stop, best, server in best_server(rasters, grid):
+            servers[start:stop] = server
+            found = server >= 0
+            server_areas[:] += np.bincount(
+                server[found],
+                weights=np.broadcast_to(areas[start:stop, None], server.shape)[found],
+                minlength=len(rasters),
+            )
+            yield image.transparent(profile.encode(best), opacity)
+
+    def server_blocks():
+        palette = np.vstack([SERVER_COLORS, [(255, 255, 255)]])
+        for start, stop in grid.blocks():
+            server = servers[start:stop]
+            colors = palette[np.where(server >= 0, server % len(SERVER_COLORS), -1)]
+            yield image.transparent(colors, opacity)
+
+    try:
+        image.write_png_rows(
+            os.path.join(path, "composite.png"),
+            grid.width,
+            grid.height,
+            4,
+            signal_blocks(),
+        )
+        servers.flush()
+        image.write_png_rows(
+            os.path.join(path, "best_server.png"),
+            grid.width,
+            grid.height,
+            4,
+            server_blocks(),
+        )
+    finally:
+        del servers
+        os.remove(servers_file)
+
+    kml = simplekml.Kml()
+    signal = kml.newgroundoverlay(name="Best signal")
+    signal.icon.href = kml.addfile(os.path.join(path, "composite.png"))
+    latlonbox(signal, grid)
+    server = kml.newgroundoverlay(name="Best server")
+    server.icon.href = kml.addfile(os.path.join(path, "best_server.png"))
+    server.visibility = 0
+    latlonbox(server, grid)
+    for i, (name, latitude, longitude) in enumerate(stations):
+        point = kml.newpoint(name=name, coords=[(longitude, latitude)])
+        color = SERVER_COLORS[i % len(SERVER_COLORS)]
+        point.style.iconstyle.color = simplekml.Color.rgb(*color.tolist())
+    kml.savekmz(os.path.join(path, "composite.kmz"))
+
+    summary = {
+        "plots": names,
+        "units": profile.units,
+        "grid": grid.to_dict(),
+        "covered_area": round(float(server_areas.sum()), 4),
+        "server_areas": {
+            name: round(float(area), 4) for name, area in zip(names, server_areas)
+        },
+        "colors": {
+            name: "#%02x%02x%02x" % tuple(SERVER_COLORS[i % len(SERVER_COLORS)])
+            for i, name in enumerate(names)
+        },
+    }
+    with open(os.path.join(path, "composite.json"), "w") as f:
+        json.dump(summary, f, indent=4)
+    return summary
@@ -0,0 +1,120 @@
+"""This module contains the coverage area statistics of plot rasters."""
+import json
+import math
+from typing import List
+
+import numpy as np
+
+from .raster import PlotRaster
+
+# Mean earth radius in km.
+EARTH_RADIUS = 6371.0088
+# Rows of the raster decoded at a time.
+CHUNK_ROWS = 512
+
+
+def row_areas(raster: PlotRaster) -> np.ndarray:
+    """Return the area in km² of one pixel of each raster row.
+
+    A pixel spans a fixed step of latitude and longitude, so its width
+    shrinks with the cosine of its row's latitude.
+    """
+    step_latitude = math.radians((raster.north - raster.south) / raster.height)
+    step_longitude = math.radians((raster.east - raster.west) / raster.width)
+    latitude = raster.north - (np.arange(raster.height) + 0.5) * (
+        (raster.north - raster.south) / raster.height
+    )
+    return (
+        EARTH_RADIUS**2
+        * step_latitude
+        * step_longitude
+        * np.cos(np.radians(latitude))
+    )
+
+
+def band_areas(raster: PlotRaster, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """Return the area in km² painted with each band of the raster's profile.
+
+    The raster is decoded a chunk of rows at a time, so memory use does not
+    grow with its size.
+    """
+    areas = row_areas(raster)
+    bands = len(raster.profile)
+    totals = np.zeros(bands, dtype=np.float64)
+    for start in range(0, raster.height, chunk_rows):
+        stop = min(start + chunk_rows, raster.height)
+        band = raster.profile.decode(raster.pixels[start:stop]).astype(np.intp)
+        weights = np.broadcast_to(areas[start:stop, None], band.shape)
+        found = band >= 0
+        totals += np.bincount(band[found], weights=weights[found], minlength=bands)
+    return totals
+
+
+def coverage_stats(raster: PlotRaster, thresholds: List[float] = None) -> dict:
+    """Return the covered area of a raster above thresholds and its signal CDF.
+
+    Pixels hold the band their signal fell in rather than the signal itself,
+    so a band counts towards a threshold only if all of it reaches the
+    threshold. For loss profiles a threshold is reached by a loss at or
+    below it. thresholds default to the profile's levels.
+
+    The CDF lists, for each band value in ascending order, the fraction of
+    the covered area with a value at or below it.
+    """
+    profile = raster.profile
+    levels = np.array(profile.levels, dtype=np.float64)
+    areas = band_areas(raster)
+    covered = float(areas.sum())
+    total = float(row_areas(raster).sum() * raster.width)
+    if thresholds is None:
+        thresholds = sorted(set(profile.levels), reverse=not profile.loss)
+    result = {
+        "units": profile.units,
+        "loss": profile.loss,
+        "width": raster.width,
+        "height": raster.height,
+        "total_area": round(total, 4),
+        "covered_area": round(covered, 4),
+        "thresholds": [],
+        "cdf": [],
+    }
+    for threshold in thresholds:
+        reached = levels <= threshold if profile.loss else levels >= threshold
+        area = float(areas[reached].sum())
+        result["thresholds"].append(
+            {
+                "threshold": threshold,
+                "area": round(area, 4),
+                "fraction": round(area / total, 6) if total else 0.0,
+            }
+        )
+    order = np.argsort(levels, kind="stable")
+    cumulative = np.cumsum(areas[order])
+    for value, area in zip(levels[order], cumulative):
+        result["cdf"].append(
+            {
+                "value": float(value),
+                "area": round(float(area), 4),
+                "fraction": round(float(area) / covered, 6) if covered else 0.0,
+            }
+        )
+    return result
+
+
+def write_coverage_stats(
+    raster: PlotRaster, filename: str, thresholds: List[float] = None
+) -> dict:
+    """Compute the coverage statistics of a raster and save them as json."""
+    stats = coverage_stats(raster, thresholds)
+    with open(filename, "w") as f:
+        json.dump(stats, f, indent=4)
+    return stats
+
+
+def load_coverage_stats(filename: str) -> dict:
+    """Return coverage statistics saved by write_coverage_stats, if any."""
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
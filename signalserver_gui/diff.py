@@ -0,0 +1,218 @@
+"""This module contains the comparison of two plots' coverage rasters."""
+import functools
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Iterator, Tuple
+
+import numpy as np
+import simplekml
+
+from . import image
+from .colors import ColorProfile
+from .composite import latlonbox
+from .coverage_stats import row_areas
+from .grid import Grid
+from .interference import level
+from .raster import PlotRaster
+
+# Change bands in dB, largest gain first. The infinite bands hold coverage
+# only one of the plots has, and changes under 1 dB are painted white,
+# which is transparent in the overlay.
+DIFF_LEVELS = [np.inf, 20, 10, 6, 3, 1, -1, -3, -6, -10, -20, -1e9, -np.inf]
+DIFF_COLORS = [
+    (8, 48, 107),
+    (33, 102, 172),
+    (67, 147, 195),
+    (146, 197, 222),
+    (209, 229, 240),
+    (235, 242, 248),
+    (255, 255, 255),
+    (253, 219, 199),
+    (244, 165, 130),
+    (214, 96, 77),
+    (178, 24, 43),
+    (140, 10, 30),
+    (103, 0, 13),
+]
+# Aligned rasters kept in the cache, least recently used are removed first.
+ALIGNED_CACHE_FILES = 32
+
+
+@functools.lru_cache(maxsize=1)
+def diff_profile() -> ColorProfile:
+    """Return the color profile change maps are painted with."""
+    return ColorProfile(DIFF_LEVELS, DIFF_COLORS, "dB change")
+
+
+def aligned_key(raster: PlotRaster, grid: Grid) -> str:
+    """Return the cache key of a raster resampled onto a grid."""
+    stat = os.stat(raster.filename)
+    digest = hashlib.sha256()
+    digest.update(
+        f"{os.path.abspath(raster.filename)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode()
+    )
+    digest.update(f"{raster.profile.levels}|{raster.profile.colors}\n".encode())
+    digest.update(json.dumps(grid.to_dict(), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def aligned(raster: PlotRaster, grid: Grid, cache_dir: str = None) -> np.ndarray:
+    """Return the values of a raster resampled onto a grid, NaN where none.
+
+    The values are written a block of rows at a time to a memory mapped
+    file, so memory use does not grow with the grid. With a cache_dir the
+    file is kept, keyed on the raster file's size and modification time,
+    the color profile and the grid, so comparing against the same raster
+    again skips decoding it.
+    """
+    shape = (grid.height, grid.width)
+    if not cache_dir:
+        values = np.memmap(tempfile.TemporaryFile(), np.float32, "w+", shape=shape)
+        for start, stop in grid.blocks():
+            values[start:stop] = grid.sample(raster, start, stop)
+        return values
+    path = os.path.join(cache_dir, "aligned")
+    filename = os.path.join(path, f"{aligned_key(raster, grid)}.npy")
+    if os.path.isfile(filename):
+        # Refresh the modification time, which orders pruning.
+        os.utime(filename)
+        return np.load(filename, mmap_mode="r")
+    os.makedirs(path, exist_ok=True)
+    staging = f"{filename}.{os.getpid()}.tmp"
+    values = np.lib.format.open_memmap(staging, "w+", np.float32, shape)
+    try:
+        for start, stop in grid.blocks():
+            values[start:stop] = grid.sample(raster, start, stop)
+        values.flush()
+        del values
+        os.replace(staging, filename)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+    prune_aligned(path)
+    return np.load(filename, mmap_mode="r")
+
+
+def prune_aligned(path: str, keep: int = ALIGNED_CACHE_FILES) -> None:
+    """Remove all but the keep most recently used aligned rasters."""
+    filenames = sorted(
+        glob.glob(os.path.join(path, "*.npy")), key=os.path.getmtime, reverse=True
+    )
+    for filename in filenames[keep:]:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+def difference(
+    baseline: PlotRaster, changed: PlotRaster, grid: Grid, cache_dir: str = None
+) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+    """Yield (start, stop, baseline, changed) received levels for row blocks.
+
+    Levels are in dB, higher being stronger, and NaN where a plot has no
+    coverage.
+    """
+    before = aligned(baseline, grid, cache_dir)
+    after = aligned(changed, grid, cache_dir)
+    for start, stop in grid.blocks():
+        yield (
+            start,
+            stop,
+            level(baseline, np.asarray(before[start:stop])),
+            level(changed, np.asarray(after[start:stop])),
+        )
+
+
+def make_diff(
+    names: Tuple[str, str],
+    baseline: PlotRaster,
+    changed: PlotRaster,
+    path: str,
+    cache_dir: str = None,
+    opacity: float = 0.75,
+) -> dict:
+    """Write the change in coverage from baseline to changed into path.
+
+    diff.png paints the change in dB, blue where the changed plot is
+    stronger and red where it is weaker, with coverage only one plot has in
+    the darkest shades. diff.kmz overlays it and diff.json reports the area
+    gained, lost, improved and degraded.
+    """
+    if baseline.profile.units != changed.profile.units:
+        raise (
+            Exception(
+                f"Plots {list(names)} mix signal units"
+                f" {sorted([baseline.profile.units, changed.profile.units])}."
+            )
+        )
+    os.makedirs(path, exist_ok=True)
+    grid = Grid.union([baseline, changed])
+    areas = row_areas(grid)
+    profile = diff_profile()
+    totals = {
+        "gained_area": 0.0,
+        "lost_area": 0.0,
+        "improved_area": 0.0,
+        "degraded_area": 0.0,
+        "unchanged_area": 0.0,
+    }
+    change = 0.0
+    extremes = [np.inf, -np.inf]
+
+    def diff_blocks():
+        nonlocal change
+        for start, stop, before, after in difference(
+            baseline, changed, grid, cache_dir
+        ):
+            weights = np.broadcast_to(areas[start:stop, None], before.shape)
+            had = ~np.isnan(before)
+            has = ~np.isnan(after)
+            both = had & has
+            delta = np.where(has, np.inf, np.where(had, -np.inf, np.nan))
+            delta[both] = after[both] - before[both]
+            totals["gained_area"] += float(weights[has & ~had].sum())
+            totals["lost_area"] += float(weights[had & ~has].sum())
+            totals["improved_area"] += float(weights[both & (delta > 0)].sum())
+            totals["degraded_area"] += float(weights[both & (delta < 0)].sum())
+            totals["unchanged_area"] += float(weights[both & (delta == 0)].sum())
+            if both.any():
+                change += float((delta[both] * weights[both]).sum())
+                extremes[0] = min(extremes[0], float(delta[both].min()))
+                extremes[1] = max(extremes[1], float(delta[both].max()))
+            yield image.transparent(profile.encode(delta), opacity)
+
+    image.write_png_rows(
+        os.path.join(path, "diff.png"), grid.width, grid.height, 4, diff_blocks()
+    )
+
+    kml = simplekml.Kml()
+    overlay = kml.newgroundoverlay(name=f"{names[0]} to {names[1]}")
+    overlay.icon.href = kml.addfile(os.path.join(path, "diff.png"))
+    latlonbox(overlay, grid)
+    kml.savekmz(os.path.join(path, "diff.kmz"))
+
+    common = (
+        totals["improved_area"] + totals["degraded_area"] + totals["unchanged_area"]
+    )
+    summary = {
+        "baseline": names[0],
+        "changed": names[1],
+        "units": "dB",
+        "grid": grid.to_dict(),
+    }
+    summary.update({name: round(area, 4) for name, area in totals.items()})
+    summary.update(
+        {
+            "common_area": round(common, 4),
+            "mean_change": round(change / common, 4) if common else None,
+            "min_change": extremes[0] if common else None,
+            "max_change": extremes[1] if common else None,
+        }
+    )
+    with open(os.path.join(path, "diff.json"), "w") as f:
+        json.dump(summary, f, indent=4)
+    return summary
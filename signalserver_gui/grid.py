@@ -0,0 +1,144 @@
+"""This module contains the common latitude/longitude grid rasters are aligned on."""
+import math
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from .raster import PlotRaster
+
+# Pixels in the largest grid built by Grid.union.
+MAX_PIXELS = 100_000_000
+# Pixels processed at a time by Grid.blocks.
+BLOCK_PIXELS = 4_000_000
+
+
+class Grid:
+    """A regular latitude/longitude grid with rows running north to south.
+
+    Rasters are resampled onto a grid by nearest neighbour, so rasters of
+    different bounds and resolutions can be combined pixel by pixel.
+    """
+
+    def __init__(
+        self,
+        north: float,
+        east: float,
+        south: float,
+        west: float,
+        width: int,
+        height: int,
+    ) -> None:
+        """Initialize a new Grid instance."""
+        self.north = north
+        self.east = east
+        self.south = south
+        self.west = west
+        self.width = width
+        self.height = height
+
+    def __repr__(self):
+        """Return a string representation of a Grid instance."""
+        return f"<Grid({self.width}x{self.height})>"
+
+    def __eq__(self, other) -> bool:
+        """Return True if both grids cover the same cells."""
+        return isinstance(other, Grid) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        """Return a hash of the grid's cells."""
+        return hash(tuple(self.to_dict().values()))
+
+    def to_dict(self) -> dict:
+        """Return a json friendly representation of the grid."""
+        return {
+            "north": self.north,
+            "east": self.east,
+            "south": self.south,
+            "west": self.west,
+            "width": self.width,
+            "height": self.height,
+        }
+
+    def latitudes(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Return the latitude of the centre of rows start to stop."""
+        rows = np.arange(start, self.height if stop is None else stop)
+        return self.north - (rows + 0.5) * (self.north - self.south) / self.height
+
+    def longitudes(self) -> np.ndarray:
+        """Return the longitude of the centre of every column."""
+        columns = np.arange(self.width)
+        return self.west + (columns + 0.5) * (self.east - self.west) / self.width
+
+    def blocks(self, pixels: int = BLOCK_PIXELS) -> Iterator[Tuple[int, int]]:
+        """Yield (start, stop) row ranges holding about pixels pixels each."""
+        rows = max(1, pixels // max(self.width, 1))
+        for start in range(0, self.height, rows):
+            yield start, min(start + rows, self.height)
+
+    def sample(
+        self, raster: PlotRaster, start: int = 0, stop: int = None
+    ) -> np.ndarray:
+        """Return the values of a raster at rows start to stop of the grid.
+
+        Each grid cell takes the value of the raster pixel holding its centre.
+        Cells outside the raster or on pixels without a value are NaN.
+        """
+        stop = self.height if stop is None else stop
+        values = np.full((stop - start, self.width), np.nan, dtype=np.float32)
+        rows = np.floor(
+            (raster.north - self.latitudes(start, stop))
+            / (raster.north - raster.south)
+            * raster.height
+        ).astype(np.intp)
+        # Wrap longitudes into the raster's range, so grids and rasters may
+        # use either side of the antimeridian.
+        longitudes = (self.longitudes() - raster.west) % 360
+        columns = np.floor(
+            longitudes / (raster.east - raster.west) * raster.width
+        ).astype(np.intp)
+        inside_rows = np.flatnonzero((rows >= 0) & (rows < raster.height))
+        inside_columns = np.flatnonzero((columns >= 0) & (columns < raster.width))
+        if len(inside_rows) and len(inside_columns):
+            values[np.ix_(inside_rows, inside_columns)] = raster.profile.decode_values(
+                raster.pixels[np.ix_(rows[inside_rows], columns[inside_columns])]
+            )
+        return values
+
+    @classmethod
+    def union(cls, rasters: List[PlotRaster], max_pixels: int = MAX_PIXELS):
+        """Return a grid covering every raster at the finest raster resolution.
+
+        The resolution is coarsened when the grid would exceed max_pixels.
+
+        Grid instance factory method.
+        """
+        north = max(raster.north for raster in rasters)
+        south = min(raster.south for raster in rasters)
+        west = min(raster.west for raster in rasters)
+        east = max(raster.east for raster in rasters)
+        step_latitude = min(
+            (raster.north - raster.south) / raster.height for raster in rasters
+        )
+        step_longitude = min(
+            (raster.east - raster.west) / raster.width for raster in rasters
+        )
+        scale = math.sqrt(
+            (north - south)
+            / step_latitude
+            * (east - west)
+            / step_longitude
+            / max_pixels
+        )
+        if scale > 1:
+            step_latitude *= scale
+            step_longitude *= scale
+        width = max(1, math.ceil((east - west) / step_longitude - 1e-9))
+        height = max(1, math.ceil((north - south) / step_latitude - 1e-9))
+        return cls(
+            north,
+            west + width * step_longitude,
+            north - height * step_latitude,
+            west,
+            width,
+            height,
+        )
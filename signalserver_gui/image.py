@@ -0,0 +1,171 @@
+"""This module contains raster image helpers for signalserver_gui."""
+import os
+import struct
+import zlib
+from typing import Callable, Iterable
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+
+
+def read_ppm(filename: str) -> np.ndarray:
+    """Memory map a binary (P6) ppm file as a height x width x 3 uint8 array."""
+    with open(filename, "rb") as f:
+        header = f.read(1024)
+    fields = []
+    offset = 0
+    while len(fields) < 4:
+        # Skip whitespace and comments between header fields.
+        while header[offset : offset + 1].isspace() or header[offset] == ord("#"):
+            if header[offset] == ord("#"):
+                offset = header.index(b"\n", offset)
+            offset += 1
+        start = offset
+        while not header[offset : offset + 1].isspace():
+            offset += 1
+        fields.append(header[start:offset])
+    # A single whitespace character separates the header from the pixels.
+    offset += 1
+    magic, width, height, maxval = fields
+    if magic != b"P6" or int(maxval) != 255:
+        raise (Exception(f"{filename} - Unsupported ppm format."))
+    return np.memmap(
+        filename,
+        dtype=np.uint8,
+        mode="r",
+        offset=offset,
+        shape=(int(height), int(width), 3),
+    )
+
+
+def transparent(rgb: np.ndarray, opacity: float = 1.0) -> np.ndarray:
+    """Return an RGBA copy of rgb with white pixels fully transparent.
+
+    All other pixels get an alpha of opacity (0.0-1.0).
+    """
+    alpha = np.full(rgb.shape[:-1], round(255 * min(max(opacity, 0.0), 1.0)))
+    alpha[(rgb == 255).all(axis=-1)] = 0
+    return np.dstack((rgb, alpha.astype(np.uint8)))
+
+
+def _png_chunk(f, chunk_type: bytes, data: bytes) -> None:
+    """Write a single length prefixed, crc suffixed png chunk."""
+    f.write(struct.pack(">I", len(data)))
+    f.write(chunk_type)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+
+
+def write_png_rows(
+    filename: str,
+    width: int,
+    height: int,
+    channels: int,
+    blocks: Iterable[np.ndarray],
+    level: int = 6,
+) -> None:
+    """Stream blocks of uint8 image rows into a png file.
+
+    Each block is an array of shape (rows, width, channels). Rows are encoded
+    with the png "up" filter, which suits the large flat areas of signalserver
+    plots, and compressed incrementally so only one block is held in memory.
+
+    The png is written to a temporary file that then replaces filename, so
+    files hard linked to the previous png, such as cache entries, are never
+    overwritten in place.
+    """
+    compressor = zlib.compressobj(level)
+    previous = np.zeros((1, width * channels), dtype=np.uint8)
+    staging = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(staging, "wb") as f:
+            f.write(PNG_SIGNATURE)
+            _png_chunk(
+                f,
+                b"IHDR",
+                struct.pack(
+                    ">IIBBBBB", width, height, 8, PNG_COLOR_TYPES[channels], 0, 0, 0
+                ),
+            )
+            for block in blocks:
+                rows = np.ascontiguousarray(block, dtype=np.uint8).reshape(
+                    -1, width * channels
+                )
+                filtered = np.empty((len(rows), width * channels + 1), dtype=np.uint8)
+                filtered[:, 0] = 2
+                np.subtract(rows[:1], previous, out=filtered[:1, 1:])
+                np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+                previous = rows[-1:]
+                data = compressor.compress(filtered.tobytes())
+                if data:
+                    _png_chunk(f, b"IDAT", data)
+            _png_chunk(f, b"IDAT", compressor.flush())
+            _png_chunk(f, b"IEND", b"")
+        os.replace(staging, filename)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+def write_png(filename: str, image: np.ndarray, block_rows: int = 512) -> None:
+    """Write a height x width (x channels) uint8 array as a png file."""
+    if image.ndim == 2:
+        image = image[:, :, np.newaxis]
+    height, width, channels = image.shape
+    write_png_rows(
+        filename,
+        width,
+        height,
+        channels,
+        (image[row : row + block_rows] for row in range(0, height, block_rows)),
+    )
+
+
+def ppm_to_png(
+    ppm_file: str,
+    png_file: str,
+    opacity: float = 1.0,
+    block_rows: int = 512,
+    recolor: Callable[[np.ndarray], np.ndarray] = None,
+) -> None:
+    """Convert a signalserver ppm plot into a png with a transparent background.
+
+    White pixels become fully transparent and all others take the given
+    opacity. The ppm is memory mapped and converted in blocks of rows, so even
+    3600 resolution plots never need a full decoded copy in memory. recolor,
+    if given, maps each block of RGB pixels to new colors first.
+    """
+    rgb = read_ppm(ppm_file)
+    height, width, _ = rgb.shape
+    recolor = recolor or (lambda block: block)
+    write_png_rows(
+        png_file,
+        width,
+        height,
+        4,
+        (
+            transparent(recolor(rgb[row : row + block_rows]), opacity)
+            for row in range(0, height, block_rows)
+        ),
+    )
+
+
+def recolor_ppm(
+    ppm_file: str,
+    out_file: str,
+    recolor: Callable[[np.ndarray], np.ndarray],
+    block_rows: int = 512,
+) -> None:
+    """Write a copy of a ppm with each block of RGB pixels mapped by recolor."""
+    rgb = read_ppm(ppm_file)
+    height, width, _ = rgb.shape
+    with open(out_file, "wb") as f:
+        f.write(f"P6\n{width} {height}\n255\n".encode())
+        for row in range(0, height, block_rows):
+            f.write(
+                np.ascontiguousarray(
+                    recolor(rgb[row : row + block_rows]), dtype=np.uint8
+                ).tobytes()
+            )
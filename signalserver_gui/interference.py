@@ -0,0 +1,161 @@
+"""This module contains the carrier to interference analysis of co-channel plots."""
+import functools
+import json
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import simplekml
+
+from . import image
+from .colors import ColorProfile
+from .composite import latlonbox
+from .coverage_stats import row_areas
+from .grid import BLOCK_PIXELS, Grid
+from .raster import PlotRaster
+
+# C/I bands in dB, best first, and the colors they are painted with.
+CI_LEVELS = [30.0, 20.0, 15.0, 10.0, 6.0, 3.0, 0.0, -1000.0]
+CI_COLORS = [
+    (0, 104, 55),
+    (26, 152, 80),
+    (102, 189, 99),
+    (166, 217, 106),
+    (254, 224, 139),
+    (253, 174, 97),
+    (244, 109, 67),
+    (165, 0, 38),
+]
+# C/I thresholds reported by default, in dB.
+CI_THRESHOLDS = [20.0, 15.0, 10.0, 6.0, 3.0, 0.0]
+
+
+@functools.lru_cache(maxsize=1)
+def ci_profile() -> ColorProfile:
+    """Return the color profile C/I maps are painted with."""
+    return ColorProfile(CI_LEVELS, CI_COLORS, "dB C/I")
+
+
+def level(raster: PlotRaster, values: np.ndarray) -> np.ndarray:
+    """Return values as received levels in dB, higher being stronger.
+
+    Loss profiles hold path loss, so their received level is taken as the
+    negated loss, which assumes the plots share an effective radiated power.
+    """
+    return -values if raster.profile.loss else values
+
+
+def carrier_to_interference(
+    serving: PlotRaster,
+    interferers: List[PlotRaster],
+    grid: Grid,
+    pixels: int = BLOCK_PIXELS,
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """Yield (start, stop, C/I) for blocks of grid rows.
+
+    Interferers are power summed, so the C/I of a cell is its serving level
+    less 10*log10(sum(10^(I/10))). Cells without a serving level are NaN and
+    cells without any interferer are +inf. Only one block of rows is held in
+    memory at a time.
+    """
+    for start, stop in grid.blocks(pixels):
+        carrier = level(serving, grid.sample(serving, start, stop))
+        power = np.zeros(carrier.shape, dtype=np.float64)
+        north, south = grid.latitudes(start, stop)[[0, -1]]
+        for raster in interferers:
+            if raster.south > north or raster.north < south:
+                continue
+            interference = level(raster, grid.sample(raster, start, stop))
+            found = ~np.isnan(interference)
+            power[found] += np.power(10.0, interference[found] / 10.0)
+        with np.errstate(divide="ignore"):
+            ci = carrier - 10 * np.log10(power)
+        # Round off the error of converting to power and back, so equal
+        # levels give a C/I of exactly 0 dB.
+        yield start, stop, np.round(ci, 3)
+
+
+def make_interference(
+    names: List[str],
+    serving: PlotRaster,
+    interferers: List[PlotRaster],
+    stations: List[Tuple[str, float, float]],
+    path: str,
+    thresholds: List[float] = None,
+    opacity: float = 0.75,
+) -> dict:
+    """Write the C/I map of a serving plot and its interferers into path.
+
+    names and stations hold the serving plot first. interference.png paints
+    the C/I of the serving plot's coverage, interference.kmz overlays it with
+    a placemark for each (name, latitude, longitude) station, and
+    interference.json summarizes the area reaching each C/I threshold.
+
+    Raster values are the lower bound of their band, so C/I is quantized to
+    the color profile's steps.
+    """
+    units = {raster.profile.units for raster in [serving] + interferers}
+    if len(units) > 1:
+        raise (Exception(f"Plots {names} mix signal units {sorted(units)}."))
+    os.makedirs(path, exist_ok=True)
+    thresholds = CI_THRESHOLDS if thresholds is None else thresholds
+    grid = Grid.union([serving])
+    areas = row_areas(grid)
+    served = 0.0
+    clear = 0.0
+    reached = np.zeros(len(thresholds), dtype=np.float64)
+    worst = np.inf
+    profile = ci_profile()
+
+    def ci_blocks():
+        nonlocal served, clear, worst
+        for start, stop, ci in carrier_to_interference(serving, interferers, grid):
+            weights = np.broadcast_to(areas[start:stop, None], ci.shape)
+            found = ~np.isnan(ci)
+            served += float(weights[found].sum())
+            clear += float(weights[np.isposinf(ci)].sum())
+            for i, threshold in enumerate(thresholds):
+                with np.errstate(invalid="ignore"):
+                    reached[i] += weights[ci >= threshold].sum()
+            if found.any():
+                worst = min(worst, float(ci[found].min()))
+            yield image.transparent(profile.encode(ci), opacity)
+
+    image.write_png_rows(
+        os.path.join(path, "interference.png"),
+        grid.width,
+        grid.height,
+        4,
+        ci_blocks(),
+    )
+
+    kml = simplekml.Kml()
+    overlay = kml.newgroundoverlay(name="C/I")
+    overlay.icon.href = kml.addfile(os.path.join(path, "interference.png"))
+    latlonbox(overlay, grid)
+    for i, (name, latitude, longitude) in enumerate(stations):
+        point = kml.newpoint(name=name, coords=[(longitude, latitude)])
+        if i:
+            point.style.iconstyle.color = simplekml.Color.red
+    kml.savekmz(os.path.join(path, "interference.kmz"))
+
+    summary = {
+        "serving": names[0],
+        "interferers": names[1:],
+        "units": "dB",
+        "grid": grid.to_dict(),
+        "served_area": round(served, 4),
+        "interference_free_area": round(clear, 4),
+        "worst": worst if np.isfinite(worst) else None,
+        "thresholds": [
+            {
+                "threshold": threshold,
+                "area": round(float(area), 4),
+                "fraction": round(float(area) / served, 6) if served else 0.0,
+            }
+            for threshold, area in zip(thresholds, reached)
+        ],
+    }
+    with open(os.path.join(path, "interference.json"), "w") as f:
+        json.dump(summary, f, indent=4)
+    return summary
@@ -0,0 +1,298 @@
+"""This module contains the background job queue for signalserver_gui."""
+import configparser
+import hashlib
+import os
+import queue
+import threading
+import traceback
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import utils
+from .composite import make_composite
+from .diff import make_diff
+from .interference import make_interference
+from .plot import Plot
+from .raster import PlotRaster
+
+
+class Job:
+    """A unit of background work tracked by a JobQueue.
+
+    Targets are called with a database session and the job's usage dict, into
+    which cpu seconds consumed by external tools are accumulated.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+    def __init__(
+        self, key: str, target: Callable[[Session, dict], None], lane: str = "default"
+    ) -> None:
+        """Initialize a new Job instance."""
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.target = target
+        self.lane = lane
+        self.usage = {"user": 0.0, "system": 0.0, "processes": 0}
+        self.status = Job.QUEUED
+        self.error = None
+        self.created = datetime.now()
+        self.started = None
+        self.finished = None
+
+    @property
+    def done(self) -> bool:
+        """Return True once the job has finished or failed."""
+        return self.status in (Job.FINISHED, Job.FAILED)
+
+    def to_dict(self) -> dict:
+        """Return a json friendly representation of the job."""
+        return {
+            "id": self.id,
+            "key": self.key,
+            "lane": self.lane,
+            "status": self.status,
+            "usage": self.usage,
+            "error": self.error,
+            "created": self.created.isoformat(),
+            "started": self.started.isoformat() if self.started else None,
+            "finished": self.finished.isoformat() if self.finished else None,
+        }
+
+    def __repr__(self):
+        """Return a string representation of a Job instance."""
+        return f"<Job('{self.id}', '{self.key}', '{self.status}')>"
+
+
+class JobQueue:
+    """Queue jobs and execute them on pools of background worker threads.
+
+    Jobs are assigned to a lane, and each lane has its own queue and worker
+    pool. The "hd" lane runs signalserverHD plots, which need far more memory
+    than the other resolutions, so they are capped independently.
+
+    Each job receives its own database session, so targets must look up the
+    rows they need by id rather than reuse objects from the request session.
+    """
+
+    def __init__(
+        self,
+        config: configparser.ConfigParser,
+        engine,
+        workers: int = None,
+        hd_workers: int = 1,
+        history: int = 200,
+    ) -> None:
+        """Initialize a new JobQueue instance and start its workers."""
+        self.config = config
+        self._session_factory = sessionmaker(bind=engine)
+        self._queues = {"default": queue.Queue(), "hd": queue.Queue()}
+        self._jobs: Dict[str, Job] = {}
+        self._latest: Dict[str, Job] = {}
+        self._history = history
+        self._lock = threading.Lock()
+        self._workers = []
+        sizes = {"default": workers or os.cpu_count() or 1, "hd": hd_workers}
+        for lane, size in sizes.items():
+            for i in range(max(1, size)):
+                worker = threading.Thread(
+                    target=self._work,
+                    args=(self._queues[lane],),
+                    name=f"job-worker-{lane}-{i}",
+                    daemon=True,
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(
+        self, key: str, target: Callable[[Session, dict], None], lane: str = "default"
+    ) -> Job:
+        """Queue a new job unless one with the same key is still pending."""
+        with self._lock:
+            job = self._latest.get(key)
+            if job and not job.done:
+                return job
+            job = Job(key, target, lane)
+            self._jobs[job.id] = job
+            self._latest[key] = job
+            self._prune()
+        self._queues[lane].put(job)
+        return job
+
+    def submit_plot(self, item: Plot) -> Job:
+        """Queue generation of all files for a plot."""
+        plot_id = item.id
+
+        def target(db: Session, usage: dict) -> None:
+            item = db.get(Plot, plot_id)
+            if item is None:
+                raise (Exception(f"Plot {plot_id} no longer exists."))
+            utils.generate(self.config, item, usage)
+
+        lane = "hd" if item.resolution == 3600 else "default"
+        return self.submit(f"plot:{plot_id}", target, lane)
+
+    def submit_composite(self, plot_ids: List[int]) -> Job:
+        """Queue the best server composite of several generated plots.
+
+        The composite is written to composites/<name> in the output directory,
+        where name is derived from the plot ids, so repeated requests for the
+        same plots share a job and its files.
+        """
+        plot_ids = sorted(set(plot_ids))
+        name = composite_name(plot_ids)
+        path = os.path.join(
+            self.config["signalservergui"]["output_dir"], "composites", name
+        )
+
+        def target(db: Session, usage: dict) -> None:
+            make_composite(*self._load_plots(db, plot_ids), path)
+
+        return self.submit(f"composite:{name}", target)
+
+    def submit_interference(self, serving_id: int, interferer_ids: List[int]) -> Job:
+        """Queue the C/I map of a serving plot against co-channel interferers.
+
+        The map is written to interference/<name> in the output directory,
+        where name is derived from the plot ids.
+        """
+        interferer_ids = sorted(set(interferer_ids) - {serving_id})
+        name = interference_name(serving_id, interferer_ids)
+        path = os.path.join(
+            self.config["signalservergui"]["output_dir"], "interference", name
+        )
+
+        def target(db: Session, usage: dict) -> None:
+            names, rasters, stations = self._load_plots(
+                db, [serving_id] + interferer_ids
+            )
+            make_interference(names, rasters[0], rasters[1:], stations, path)
+
+        return self.submit(f"interference:{name}", target)
+
+    def submit_diff(self, baseline_id: int, changed_id: int) -> Job:
+        """Queue the comparison of a plot's coverage with a baseline plot's.
+
+        The comparison is written to diffs/<name> in the output directory,
+        where name is derived from the plot ids. Resampled rasters are kept
+        in the cache directory, so comparisons against the same baseline
+        only decode it once.
+        """
+        name = diff_name(baseline_id, changed_id)
+        path = os.path.join(self.config["signalservergui"]["output_dir"], "diffs", name)
+
+        def target(db: Session, usage: dict) -> None:
+            names, rasters, stations = self._load_plots(db, [baseline_id, changed_id])
+            make_diff(
+                names,
+                rasters[0],
+                rasters[1],
+                path,
+                self.config["signalservergui"].get("cache_dir"),
+            )
+
+        return self.submit(f"diff:{name}", target)
+
+    def _load_plots(
+        self, db: Session, plot_ids: List[int]
+    ) -> Tuple[List[str], List[PlotRaster], List[Tuple[str, float, float]]]:
+        """Return the names, rasters and transmitter sites of generated plots."""
+        names = []
+        rasters = []
+        stations = []
+        for plot_id in plot_ids:
+            item = db.get(Plot, plot_id)
+            if item is None:
+                raise (Exception(f"Plot {plot_id} no longer exists."))
+            file_base = os.path.join(
+                self.config["signalservergui"]["output_dir"], str(item.id), item.name
+            )
+            names.append(item.name)
+            rasters.append(
+                PlotRaster.from_plot(
+                    file_base,
+                    self.config["signalserver"]["color_profile"],
+                    item.use_dbm,
+                )
+            )
+            station = item.station1
+            stations.append((station.name, station.latitude, station.longitude))
+        return names, rasters, stations
+
+    def summary(self) -> dict:
+        """Return job counts by status and the total cpu seconds recorded."""
+        summary = {"queued": 0, "running": 0, "finished": 0, "failed": 0}
+        cpu = 0.0
+        for job in list(self._jobs.values()):
+            summary[job.status] += 1
+            cpu += job.usage["user"] + job.usage["system"]
+        summary["cpu_seconds"] = cpu
+        return summary
+
+    def jobs(self) -> List[Job]:
+        """Return all tracked jobs, oldest first."""
+        return list(self._jobs.values())
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job with the given id."""
+        return self._jobs.get(job_id)
+
+    def latest(self, key: str) -> Optional[Job]:
+        """Return the most recently submitted job for a key."""
+        return self._latest.get(key)
+
+    def _prune(self) -> None:
+        """Forget the oldest completed jobs once history exceeds its limit."""
+        excess = len(self._jobs) - self._history
+        if excess <= 0:
+            return
+        for job in [job for job in self._jobs.values() if job.done][:excess]:
+            del self._jobs[job.id]
+            if self._latest.get(job.key) is job:
+                del self._latest[job.key]
+
+    def _work(self, jobs: queue.Queue) -> None:
+        """Execute jobs from a lane's queue until the process exits."""
+        while True:
+            job = jobs.get()
+            job.status = Job.RUNNING
+            job.started = datetime.now()
+            db = self._session_factory()
+            try:
+                job.target(db, job.usage)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                job.error = str(e)
+                job.status = Job.FAILED
+                traceback.print_exc()
+            else:
+                job.status = Job.FINISHED
+            finally:
+                db.close()
+                job.finished = datetime.now()
+                jobs.task_done()
+
+
+def composite_name(plot_ids: List[int]) -> str:
+    """Return the directory name of the composite of a set of plots."""
+    key = ",".join(str(plot_id) for plot_id in sorted(set(plot_ids)))
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def interference_name(serving_id: int, interferer_ids: List[int]) -> str:
+    """Return the directory name of the C/I map of a serving plot."""
+    key = f"{serving_id}:" + ",".join(str(i) for i in sorted(set(interferer_ids)))
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def diff_name(baseline_id: int, changed_id: int) -> str:
+    """Return the directory name of the comparison of two plots."""
+    key = f"{baseline_id}>{changed_id}"
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
@@ -0,0 +1,178 @@
+"""This module contains the all pairs station link matrix."""
+import csv
+import io
+import threading
+from typing import List, Tuple
+
+import numpy as np
+import pyproj
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .station import Station
+
+# Cached matrices, keyed by frequency. Committing a change to any station
+# bumps the version, which invalidates every cached matrix.
+_lock = threading.Lock()
+_version = 0
+_matrices = {}
+# Matrices for this many frequencies are kept.
+CACHE_SIZE = 8
+
+FIELDS = [
+    "station1_id",
+    "station1",
+    "station2_id",
+    "station2",
+    "distance",
+    "azimuth",
+    "back_azimuth",
+    "free_space_path_loss",
+]
+
+
+def free_space_path_loss(distance: np.ndarray, frequency: float) -> np.ndarray:
+    """Return the free space path loss in dB for distances in km and MHz.
+
+    Co-located stations have no meaningful path loss and are given NaN.
+    """
+    with np.errstate(divide="ignore"):
+        loss = 20 * np.log10(distance) + 20 * np.log10(frequency) + 32.44
+    loss[distance <= 0] = np.nan
+    return loss
+
+
+class LinkMatrix:
+    """Distance, azimuths and free space path loss for every station pair.
+
+    Pairs are the upper triangle of the station list, so every unordered pair
+    appears once. azimuth points from station1 to station2 and back_azimuth
+    from station2 to station1. Distances are in km and path loss in dB.
+    """
+
+    def __init__(
+        self, stations: List[Tuple[int, str, float, float]], frequency: float
+    ) -> None:
+        """Initialize a new LinkMatrix from (id, name, latitude, longitude) rows."""
+        self.frequency = frequency
+        self.ids = np.array([station[0] for station in stations], dtype=int)
+        self.names = [station[1] for station in stations]
+        latitude = np.array([station[2] for station in stations], dtype=float)
+        longitude = np.array([station[3] for station in stations], dtype=float)
+        self.first, self.second = np.triu_indices(len(stations), k=1)
+        geodesic = pyproj.Geod(ellps="WGS84")
+        azimuth, back_azimuth, distance = geodesic.inv(
+            longitude[self.first],
+            latitude[self.first],
+            longitude[self.second],
+            latitude[self.second],
+        )
+        self.azimuth = np.asarray(azimuth) % 360
+        self.back_azimuth = np.asarray(back_azimuth) % 360
+        self.distance = np.asarray(distance) / 1000
+        self.free_space_path_loss = free_space_path_loss(self.distance, frequency)
+
+    def __len__(self) -> int:
+        """Return the number of station pairs."""
+        return len(self.first)
+
+    def __repr__(self):
+        """Return a string representation of a LinkMatrix instance."""
+        return f"<LinkMatrix({len(self.ids)} stations, {self.frequency} MHz)>"
+
+    def select(
+        self, max_distance: float = None, max_path_loss: float = None, limit=None
+    ) -> np.ndarray:
+        """Return the indexes of matching pairs, by ascending path loss."""
+        mask = np.ones(len(self), dtype=bool)
+        if max_distance is not None:
+            mask &= self.distance <= max_distance
+        if max_path_loss is not None:
+            mask &= self.free_space_path_loss <= max_path_loss
+        pairs = np.flatnonzero(mask)
+        pairs = pairs[np.argsort(self.free_space_path_loss[pairs], kind="stable")]
+        return pairs[:limit] if limit is not None else pairs
+
+    def columns(self, pairs: np.ndarray) -> List[list]:
+        """Return a list of values for each of FIELDS, one per pair index.
+
+        Values are rounded and converted in bulk, which is much faster than
+        building them one pair at a time.
+        """
+        first = self.first[pairs]
+        second = self.second[pairs]
+        names = np.array(self.names, dtype=object)
+        loss = np.round(self.free_space_path_loss[pairs], 2)
+        return [
+            self.ids[first].tolist(),
+            names[first].tolist(),
+            self.ids[second].tolist(),
+            names[second].tolist(),
+            np.round(self.distance[pairs], 4).tolist(),
+            np.round(self.azimuth[pairs], 2).tolist(),
+            np.round(self.back_azimuth[pairs], 2).tolist(),
+            np.where(np.isnan(loss), None, loss).tolist(),
+        ]
+
+    def rows(self, pairs: np.ndarray) -> List[list]:
+        """Return a row of FIELDS values for each pair index."""
+        return list(map(list, zip(*self.columns(pairs))))
+
+    def to_dict(self, pairs: np.ndarray) -> dict:
+        """Return a json friendly summary of the selected pairs."""
+        return {
+            "frequency": self.frequency,
+            "stations": len(self.ids),
+            "units": {"distance": "km", "free_space_path_loss": "dB"},
+            "pairs": [dict(zip(FIELDS, row)) for row in zip(*self.columns(pairs))],
+        }
+
+    def to_csv(self, pairs: np.ndarray) -> str:
+        """Return the selected pairs as csv text with a header row."""
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(FIELDS)
+        writer.writerows(zip(*self.columns(pairs)))
+        return text.getvalue()
+
+
+def link_matrix(db: Session, frequency: float) -> LinkMatrix:
+    """Return the link matrix of all stations, computing it when stale."""
+    with _lock:
+        version = _version
+        cached = _matrices.get(frequency)
+    if cached and cached[0] == version:
+        return cached[1]
+    stations = (
+        db.query(Station.id, Station.name, Station.latitude, Station.longitude)
+        .order_by(Station.id)
+        .all()
+    )
+    matrix = LinkMatrix(stations, frequency)
+    with _lock:
+        _matrices.pop(frequency, None)
+        if len(_matrices) >= CACHE_SIZE:
+            _matrices.pop(next(iter(_matrices)))
+        _matrices[frequency] = (version, matrix)
+    return matrix
+
+
+@event.listens_for(Station, "after_insert")
+@event.listens_for(Station, "after_update")
+@event.listens_for(Station, "after_delete")
+def _station_changed(mapper, connection, target) -> None:
+    """Flag the session of a station row written by a flush."""
+    object_session(target).info["stations_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate(session: Session) -> None:
+    """Invalidate cached link matrices once station changes are committed.
+
+    Waiting for the commit keeps other sessions from caching a matrix built
+    before the change was visible to them.
+    """
+    global _version
+    if session.info.pop("stations_changed", False):
+        with _lock:
+            _version += 1
@@ -0,0 +1,173 @@
+"""Module contains declarative LinkReport classes for database."""
+from datetime import datetime
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    inspect,
+)
+from sqlalchemy.orm import Session, backref, relationship
+from .analysis_report.analysis_report import AnalysisReport
+from .plot import Plot
+
+from signalserver_gui import Base
+
+
+class LinkReport(Base):
+    """Class representing the point to point analysis results of a plot.
+
+    Rows mirror the plot's .json analysis report so links can be filtered
+    and sorted across plots with indexed queries.
+    """
+
+    __tablename__ = "link_reports"
+    id = Column(Integer, primary_key=True)
+    plot_id = Column(
+        Integer,
+        ForeignKey("plots.id", ondelete="CASCADE"),
+        unique=True,
+        nullable=False,
+    )
+    use_metric = Column(Boolean, default=False, nullable=False)
+    distance = Column(Float)
+    free_space_path_loss = Column(Float)
+    computed_path_loss = Column(Float, index=True)
+    terrain_shielding_attenuation = Column(Float)
+    field_strength_at_rx = Column(Float)
+    power_level_at_rx = Column(Float, index=True)
+    power_density_at_rx = Column(Float)
+    longley_rice_errors = Column(Integer)
+    rx_adjustment_to_clear_obstructions = Column(Float)
+    rx_adjustment_to_clear_first_fresnel_zone = Column(Float)
+    rx_adjustment_to_clear_first_fresnel_zone60 = Column(Float)
+    obstruction_count = Column(Integer, default=0, nullable=False)
+    rx_threshold = Column(Float)
+    margin = Column(Float, index=True)
+    created = Column(DateTime, default=datetime.now)
+    plot = relationship(
+        "Plot",
+        backref=backref("link_report", uselist=False, cascade="all, delete-orphan"),
+    )
+    obstructions = relationship(
+        "LinkObstruction",
+        order_by="LinkObstruction.position",
+        cascade="all, delete-orphan",
+    )
+
+    def __repr__(self):
+        """Return a string representation of a LinkReport instance."""
+        return f"<LinkReport('{self.plot_id}', '{self.computed_path_loss}')>"
+
+    @classmethod
+    def from_report(cls, plot: Plot, report: AnalysisReport):
+        """Create a new LinkReport from a plot's parsed analysis report.
+
+        The fade margin is how far the link clears the antenna's Rx
+        threshold, which is in the units of the plot: dBm, dBuV/m, or dB of
+        path loss for plots without an effective radiated power. It is left
+        empty when no threshold is set.
+        """
+        link = report.link
+        threshold = plot.antenna.rx_threshhold if plot.antenna else None
+        margin = None
+        if threshold is not None:
+            if not plot.effective_radiated_power:
+                margin = threshold - link.computed_path_loss
+            elif plot.use_dbm:
+                margin = link.power_level_at_rx - threshold
+            else:
+                margin = link.field_strength_at_rx - threshold
+        link_report = cls(
+            plot=plot,
+            use_metric=link.use_metric,
+            distance=report.transmitter.distance,
+            free_space_path_loss=link.free_space_path_loss,
+            computed_path_loss=link.computed_path_loss,
+            terrain_shielding_attenuation=link.terrain_shielding_attenuation,
+            field_strength_at_rx=link.field_strength_at_rx,
+            power_level_at_rx=link.power_level_at_rx,
+            power_density_at_rx=link.power_density_at_rx,
+            longley_rice_errors=link.longley_rice_errors,
+            rx_adjustment_to_clear_obstructions=link.rx_adjustment_to_clear_obstructions,
+            rx_adjustment_to_clear_first_fresnel_zone=link.rx_adjustment_to_clear_first_fresnel_zone,
+            rx_adjustment_to_clear_first_fresnel_zone60=link.rx_adjustment_to_clear_first_fresnel_zone60,
+            obstruction_count=len(link.obstructions),
+            rx_threshold=threshold,
+            margin=margin,
+        )
+        link_report.obstructions = [
+            LinkObstruction(
+                position=i,
+                latitude=obs.latitude,
+                longitude=obs.longitude,
+                distance=obs.distance,
+                height=obs.height,
+                metric=obs.metric,
+            )
+            for i, obs in enumerate(link.obstructions)
+        ]
+        return link_report
+
+    @classmethod
+    def record(cls, db: Session, plot: Plot, report: AnalysisReport):
+        """Replace the stored link report of a plot."""
+        previous = plot.link_report
+        if previous is not None:
+            if inspect(previous).persistent:
+                # Delete first so the new row does not clash on plot_id.
+                db.delete(previous)
+                db.flush()
+            else:
+                db.expunge(previous)
+        link_report = cls.from_report(plot, report)
+        db.add(link_report)
+        return link_report
+
+    def to_dict(self) -> dict:
+        """Return a json friendly summary of the link report."""
+        return {
+            "plot_id": self.plot_id,
+            "plot": self.plot.name,
+            "use_metric": self.use_metric,
+            "distance": self.distance,
+            "free_space_path_loss": self.free_space_path_loss,
+            "computed_path_loss": self.computed_path_loss,
+            "terrain_shielding_attenuation": self.terrain_shielding_attenuation,
+            "field_strength_at_rx": self.field_strength_at_rx,
+            "power_level_at_rx": self.power_level_at_rx,
+            "power_density_at_rx": self.power_density_at_rx,
+            "longley_rice_errors": self.longley_rice_errors,
+            "rx_adjustment_to_clear_obstructions": self.rx_adjustment_to_clear_obstructions,
+            "rx_adjustment_to_clear_first_fresnel_zone": self.rx_adjustment_to_clear_first_fresnel_zone,
+            "rx_adjustment_to_clear_first_fresnel_zone60": self.rx_adjustment_to_clear_first_fresnel_zone60,
+            "obstruction_count": self.obstruction_count,
+            "rx_threshold": self.rx_threshold,
+            "margin": self.margin,
+            "created": self.created.isoformat() if self.created else None,
+        }
+
+
+class LinkObstruction(Base):
+    """Class representing an obstruction along a LinkReport's path."""
+
+    __tablename__ = "link_obstructions"
+    id = Column(Integer, primary_key=True)
+    link_report_id = Column(
+        Integer,
+        ForeignKey("link_reports.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    position = Column(Integer, nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    distance = Column(Float, nullable=False)
+    height = Column(Float, nullable=False)
+    metric = Column(Boolean, default=False, nullable=False)
+
+    def __repr__(self):
+        """Return a string representation of a LinkObstruction instance."""
+        return f"<LinkObstruction('{self.link_report_id}', '{self.position}')>"
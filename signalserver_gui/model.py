@@ -3,6 +3,8 @@ import os
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from .antenna import load_antennas
+from .link_report import LinkReport
+from .spatial import create_index
 
 from signalserver_gui import Base
 
@@ -31,15 +33,22 @@ def init(db_path: str):
         db_file_init(db_file)
     engine = create_engine(f"sqlite:///{db_file}", echo=False)
     event.listen(engine, "connect", _fk_pragma_on_connect)
+    # Add tables introduced since the database was created, such as
+    # link_reports. create_all leaves existing tables untouched.
+    Base.metadata.create_all(engine)
+    create_index(engine)
     return engine
 
 
 # Map all global parameters to their various attributes.
+# Parameters marked area_only only affect the coverage image and are left out
+# of the point to point analysis run.
 global_args = {
     "terrain_greyscale": {
         "flag": "-t",
         "type": bool,
         "depends": None,
+        "area_only": True,
         "hint": "Terrain greyscale background",
     },
     "debug": {
@@ -58,6 +67,7 @@ global_args = {
         "flag": "-haf",
         "type": int,
         "depends": None,
+        "area_only": True,
         "hint": "Halve 1 or 2 (optional)",
     },
     "nothreads": {
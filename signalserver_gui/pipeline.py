@@ -0,0 +1,184 @@
+"""This module contains a minimal incremental build pipeline for plot files."""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+
+class Stage:
+    """A step of plot generation with declared inputs and outputs.
+
+    func is called with a dict mapping the names of completed stages to the
+    values they returned, and must return a json serializable value.
+
+    after lists the stages whose results this stage consumes, and waits lists
+    stages that must merely finish first without affecting its fingerprint.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        params: dict = None,
+        after: List[str] = None,
+        outputs: List[str] = None,
+        waits: List[str] = None,
+    ) -> None:
+        """Initialize a new Stage instance."""
+        self.name = name
+        self.func = func
+        self.params = params or {}
+        self.after = after or []
+        self.outputs = outputs or []
+        self.waits = waits or []
+
+    def __repr__(self):
+        """Return a string representation of a Stage instance."""
+        return f"<Stage('{self.name}')>"
+
+
+class Pipeline:
+    """Run stages concurrently, skipping those whose inputs have not changed.
+
+    A stage's fingerprint hashes its params together with the fingerprints of
+    the stages it runs after, so a change propagates to everything downstream.
+    A stage is skipped when its fingerprint matches the previous run and all
+    of its outputs still exist. Fingerprints, values and timings are recorded
+    in a hidden manifest file in the output directory.
+
+    Stages are started on a thread pool as soon as every stage they run after
+    or wait for has completed.
+    """
+
+    manifest_name = ".manifest.json"
+
+    def __init__(self, path: str, workers: int = 4) -> None:
+        """Initialize a new Pipeline instance for an output directory."""
+        self.path = path
+        self.workers = workers
+        self.stages: Dict[str, Stage] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        params: dict = None,
+        after: List[str] = None,
+        outputs: List[str] = None,
+        waits: List[str] = None,
+    ) -> Stage:
+        """Add a stage to the pipeline."""
+        for dependency in (after or []) + (waits or []):
+            if dependency not in self.stages:
+                raise (Exception(f"{name} - Unknown stage dependency {dependency}."))
+        stage = Stage(name, func, params, after, outputs, waits)
+        self.stages[name] = stage
+        return stage
+
+    def load_manifest(self) -> dict:
+        """Return the manifest of the previous run, if any."""
+        try:
+            with open(os.path.join(self.path, self.manifest_name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest: dict) -> None:
+        """Save the manifest of the current run."""
+        with open(os.path.join(self.path, self.manifest_name), "w") as f:
+            json.dump(manifest, f, indent=4)
+
+    def fingerprint(self, stage: Stage, fingerprints: Dict[str, str]) -> str:
+        """Return the fingerprint of a stage's inputs."""
+        inputs = {
+            "params": stage.params,
+            "after": {name: fingerprints[name] for name in stage.after},
+            "outputs": [os.path.basename(output) for output in stage.outputs],
+        }
+        return hashlib.sha256(
+            json.dumps(inputs, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def current(self, stage: Stage, fingerprint: str, previous: dict) -> bool:
+        """Return True if a stage's previous results can be reused."""
+        record = previous.get(stage.name)
+        return (
+            record is not None
+            and record["fingerprint"] == fingerprint
+            and all(os.path.exists(output) for output in stage.outputs)
+        )
+
+    def execute(self, stage: Stage, fingerprint: str, values: dict) -> dict:
+        """Run a stage and return its manifest record."""
+        started = time.perf_counter()
+        value = stage.func(values)
+        return {
+            "fingerprint": fingerprint,
+            "value": value,
+            "seconds": time.perf_counter() - started,
+            "finished": datetime.now().isoformat(),
+        }
+
+    def run(self) -> Dict[str, dict]:
+        """Run all out of date stages and return each stage's timing record.
+
+        If a stage fails, no further stages are started, the running ones are
+        allowed to finish and the first error is raised.
+        """
+        previous = self.load_manifest().get("stages", {})
+        # Records of stages that are not reached because an earlier stage
+        # failed are kept, their fingerprints still guard against reuse.
+        manifest = {"stages": dict(previous)}
+        timings = {}
+        fingerprints = {}
+        values = {}
+        pending = list(self.stages.values())
+        running = {}
+        error = None
+        try:
+            with ThreadPoolExecutor(self.workers) as executor:
+                while pending or running:
+                    for stage in list(pending):
+                        if error or any(
+                            name not in values for name in stage.after + stage.waits
+                        ):
+                            continue
+                        pending.remove(stage)
+                        fingerprint = self.fingerprint(stage, fingerprints)
+                        fingerprints[stage.name] = fingerprint
+                        if self.current(stage, fingerprint, previous):
+                            print("Up to date:", stage.name)
+                            timings[stage.name] = {"ran": False, "seconds": 0.0}
+                            values[stage.name] = previous[stage.name]["value"]
+                        else:
+                            future = executor.submit(
+                                self.execute, stage, fingerprint, dict(values)
+                            )
+                            running[future] = stage
+                    if error and not running:
+                        break
+                    if not running:
+                        # Skipped stages may have unblocked others.
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        try:
+                            record = future.result()
+                        except Exception as e:
+                            error = error or e
+                            continue
+                        manifest["stages"][stage.name] = record
+                        timings[stage.name] = {
+                            "ran": True,
+                            "seconds": record["seconds"],
+                        }
+                        values[stage.name] = record["value"]
+        finally:
+            self.save_manifest(manifest)
+        if error:
+            raise error
+        return timings
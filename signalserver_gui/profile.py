@@ -0,0 +1,196 @@
+"""This module contains the point to point path profile loader."""
+import functools
+import os
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+
+# Suffixes of the signalserver point to point analysis data files.
+SERIES = ("profile", "reference", "curvature", "fresnel", "fresnel60")
+# Suffix of the binary file holding every series of a plot.
+SIDECAR = "_profile.npz"
+
+
+def load_series(filename: str) -> np.ndarray:
+    """Parse a signalserver "distance value" data file into an N x 2 array."""
+    try:
+        return np.loadtxt(filename, dtype=np.float64, usecols=(0, 1), ndmin=2)
+    except ValueError as e:
+        raise (Exception(f"{filename} - Malformed profile data. {e}"))
+
+
+def lttb(data: np.ndarray, threshold: int) -> np.ndarray:
+    """Downsample N x 2 rows to threshold rows with Largest-Triangle-Three-Buckets.
+
+    The first and last rows are kept. The rows between them are split into
+    threshold - 2 buckets, and from each bucket the row forming the largest
+    triangle with the previously kept row and the mean of the next bucket is
+    kept. Peaks and dips therefore survive downsampling.
+    """
+    n = len(data)
+    if threshold < 3 or threshold >= n:
+        return data
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    means = np.add.reduceat(data[1 : n - 1], edges[:-1] - 1, axis=0)
+    means /= np.diff(edges)[:, None]
+    following = np.vstack([means[1:], data[-1:]])
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = data[0]
+    for i in range(threshold - 2):
+        bucket = data[edges[i] : edges[i + 1]]
+        c = following[i]
+        area = np.abs(
+            (a[0] - c[0]) * (bucket[:, 1] - a[1])
+            - (a[0] - bucket[:, 0]) * (c[1] - a[1])
+        )
+        kept[i + 1] = edges[i] + int(np.argmax(area))
+        a = data[kept[i + 1]]
+    return data[kept]
+
+
+class PathProfile:
+    """The terrain profile and reference series of a point to point link.
+
+    Each series is an N x 2 float array of (distance, value) rows in the
+    plot's distance and height units. Profiles are loaded once and shared by
+    chart rendering and analysis.
+    """
+
+    def __init__(self, series: Dict[str, np.ndarray]) -> None:
+        """Initialize a new PathProfile instance."""
+        self.series = series
+
+    @property
+    def profile(self) -> np.ndarray:
+        """Terrain elevation along the path."""
+        return self.series["profile"]
+
+    @property
+    def reference(self) -> np.ndarray:
+        """Line of sight between the antennas."""
+        return self.series["reference"]
+
+    @property
+    def curvature(self) -> np.ndarray:
+        """Earth curvature along the path."""
+        return self.series["curvature"]
+
+    @property
+    def fresnel(self) -> np.ndarray:
+        """First Fresnel zone boundary."""
+        return self.series["fresnel"]
+
+    @property
+    def fresnel60(self) -> np.ndarray:
+        """60% first Fresnel zone boundary."""
+        return self.series["fresnel60"]
+
+    def clearance(self, boundary: str = "reference") -> np.ndarray:
+        """Return the height of a boundary series above the terrain.
+
+        The boundary is interpolated onto the terrain profile's distances, so
+        negative values mark where the terrain obstructs it.
+        """
+        line = self.series[boundary]
+        return (
+            np.interp(self.profile[:, 0], line[:, 0], line[:, 1]) - self.profile[:, 1]
+        )
+
+    def __len__(self) -> int:
+        """Return the number of samples along the path."""
+        return len(self.series["profile"])
+
+    def __repr__(self):
+        """Return a string representation of a PathProfile instance."""
+        return f"<PathProfile({len(self)} samples)>"
+
+    def downsample(self, points: int):
+        """Return a copy with every series reduced to at most points rows."""
+        return PathProfile(
+            {name: lttb(series, points) for name, series in self.series.items()}
+        )
+
+    def to_dict(self) -> dict:
+        """Return the series as json friendly distance and value lists."""
+        return {
+            name: {"distance": series[:, 0].tolist(), "value": series[:, 1].tolist()}
+            for name, series in self.series.items()
+        }
+
+    def save(self, filename: str) -> None:
+        """Write every series to an uncompressed .npz file.
+
+        The file is written under a temporary name and moved into place, so
+        concurrent readers never see a partial file.
+        """
+        staging = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(staging, "wb") as f:
+            np.savez(f, **self.series)
+        os.replace(staging, filename)
+
+    @classmethod
+    def from_sidecar(cls, filename: str):
+        """Load a profile written by save.
+
+        PathProfile instance factory method.
+        """
+        with np.load(filename) as data:
+            return cls({name: data[name] for name in SERIES})
+
+    @classmethod
+    def load(cls, file_base: str):
+        """Load the profile of a plot, preferring its binary sidecar.
+
+        The text data files are parsed when the sidecar is missing or older
+        than any of them.
+
+        PathProfile instance factory method.
+        """
+        sidecar = f"{file_base}{SIDECAR}"
+        try:
+            written = os.stat(sidecar).st_mtime_ns
+        except FileNotFoundError:
+            return cls.from_files(file_base)
+        for name in SERIES:
+            try:
+                if os.stat(f"{file_base}_{name}").st_mtime_ns > written:
+                    return cls.from_files(file_base)
+            except FileNotFoundError:
+                pass
+        return cls.from_sidecar(sidecar)
+
+    @classmethod
+    def from_files(cls, file_base: str):
+        """Load the data files signalserver writes next to a report.
+
+        PathProfile instance factory method.
+        """
+        return cls({name: load_series(f"{file_base}_{name}") for name in SERIES})
+
+
+def _stamp(file_base: str) -> Tuple[int, ...]:
+    """Return the modification times of a plot's profile files."""
+    stamp = []
+    for suffix in [SIDECAR] + [f"_{name}" for name in SERIES]:
+        try:
+            stamp.append(os.stat(f"{file_base}{suffix}").st_mtime_ns)
+        except FileNotFoundError:
+            stamp.append(0)
+    return tuple(stamp)
+
+
+@functools.lru_cache(maxsize=64)
+def _downsampled(file_base: str, points: int, stamp: Tuple[int, ...]) -> dict:
+    """Load and downsample a profile, cached until its files change."""
+    return PathProfile.load(file_base).downsample(points).to_dict()
+
+
+def downsampled(file_base: str, points: int) -> dict:
+    """Return the json friendly series of a plot downsampled to points rows.
+
+    Results are cached per plot and point budget, and recomputed once the
+    plot's profile files are rewritten.
+    """
+    return _downsampled(file_base, points, _stamp(file_base))
@@ -0,0 +1,163 @@
+"""This module contains the georeferenced coverage raster of a plot."""
+import os
+import re
+from typing import List, Tuple
+
+import numpy as np
+
+from . import colors
+from .colors import ColorProfile
+from .image import read_ppm
+from .pipeline import Pipeline
+
+
+# signalserver prints the coverage bounds as "|N|E|S|W|".
+_NUMBER = r"\s*([-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)\s*"
+DIMENSIONS = re.compile(r"\|" + r"\|".join([_NUMBER] * 4) + r"\|")
+
+
+def parse_dimensions(dimensions: str) -> Tuple[float, float, float, float]:
+    """Return (north, east, south, west) from signalserver's "|N|E|S|W|" output.
+
+    signalserver's output may hold debug messages and warnings around the
+    bounds, so the last "|N|E|S|W|" group is used.
+    """
+    groups = DIMENSIONS.findall(dimensions or "")
+    if not groups:
+        raise (Exception(f"{dimensions} - Malformed raster dimensions."))
+    north, east, south, west = (float(value) for value in groups[-1])
+    return north, east, south, west
+
+
+def profile_file(file_base: str, color_profile: str, use_dbm: bool = True) -> str:
+    """Return the color profile signalserver painted the raster at file_base with.
+
+    signalserver writes the profile it used next to the raster. If there is
+    none, color_profile is assumed.
+    """
+    extensions = [".dcf", ".scf", ".lcf"] if use_dbm else [".scf", ".lcf", ".dcf"]
+    for extension in extensions:
+        if os.path.isfile(f"{file_base}{extension}"):
+            return f"{file_base}{extension}"
+    return color_profile
+
+
+class PlotRaster:
+    """A memory mapped signalserver coverage image and its bounds.
+
+    Pixels are only read when they are indexed, so looking up points in a
+    large raster costs little more than opening it.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        bounds: Tuple[float, float, float, float],
+        profile: ColorProfile,
+    ) -> None:
+        """Initialize a new PlotRaster for a ppm with (north, east, south, west) bounds."""
+        self.filename = filename
+        self.north, self.east, self.south, self.west = bounds
+        # Rasters crossing the antimeridian have an east bound below west.
+        if self.east < self.west:
+            self.east += 360
+        self.profile = profile
+        self.pixels = read_ppm(filename)
+        self.height, self.width, _ = self.pixels.shape
+
+    def __repr__(self):
+        """Return a string representation of a PlotRaster instance."""
+        return f"<PlotRaster('{self.filename}', {self.width}x{self.height})>"
+
+    def pixel(
+        self, latitude: np.ndarray, longitude: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the rows and columns of coordinates, and which are inside."""
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+        longitude = np.where(longitude < self.west, longitude + 360, longitude)
+        row = np.floor(
+            (self.north - latitude) / (self.north - self.south) * self.height
+        )
+        column = np.floor(
+            (longitude - self.west) / (self.east - self.west) * self.width
+        )
+        inside = (row >= 0) & (row < self.height) & (column >= 0)
+        inside &= column < self.width
+        return (
+            np.where(inside, row, 0).astype(int),
+            np.where(inside, column, 0).astype(int),
+            inside,
+        )
+
+    def decode(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Return the values of rows start to stop, NaN where there is none.
+
+        Large rasters should be decoded a band of rows at a time to bound
+        memory use.
+        """
+        return self.profile.decode_values(self.pixels[start:stop])
+
+    def query(self, latitude, longitude) -> List[dict]:
+        """Return the signal band at each coordinate.
+
+        Coordinates outside the raster or on pixels without a profile color,
+        such as the background, have no value.
+        """
+        latitude = np.atleast_1d(np.asarray(latitude, dtype=float))
+        longitude = np.atleast_1d(np.asarray(longitude, dtype=float))
+        row, column, inside = self.pixel(latitude, longitude)
+        bands = np.where(inside, self.profile.decode(self.pixels[row, column]), -1)
+        results = []
+        for lat, lon, band in zip(latitude.tolist(), longitude.tolist(), bands):
+            result = {
+                "latitude": lat,
+                "longitude": lon,
+                "value": None,
+                "min": None,
+                "max": None,
+                "units": self.profile.units,
+            }
+            if band >= 0:
+                result["min"], result["max"] = self.profile.band(band)
+                result["value"] = result["max"] if self.profile.loss else result["min"]
+            results.append(result)
+        return results
+
+    @classmethod
+    def open(
+        cls,
+        file_base: str,
+        dimensions: str,
+        color_profile: str,
+        use_dbm: bool = True,
+    ):
+        """Open the raster signalserver wrote to file_base.
+
+        dimensions is the "|N|E|S|W|" bounds signalserver printed. The color
+        profile signalserver wrote next to the raster is used if there is
+        one, otherwise color_profile.
+
+        PlotRaster instance factory method.
+        """
+        return cls(
+            f"{file_base}.ppm",
+            parse_dimensions(dimensions),
+            colors.load(profile_file(file_base, color_profile, use_dbm)),
+        )
+
+    @classmethod
+    def from_plot(cls, file_base: str, color_profile: str, use_dbm: bool = True):
+        """Open the raster generate wrote for a plot.
+
+        The bounds come from the coverage stage's value in the plot's
+        manifest.
+
+        PlotRaster instance factory method.
+        """
+        manifest = Pipeline(os.path.dirname(file_base)).load_manifest()
+        try:
+            dimensions = manifest["stages"]["coverage"]["value"]
+        except (KeyError, TypeError):
+            raise (Exception(f"{file_base} - Raster bounds are unknown."))
+        return cls.open(file_base, dimensions, color_profile, use_dbm)
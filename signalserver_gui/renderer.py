@@ -0,0 +1,282 @@
+"""This module contains the long lived chart renderer for signalserver_gui."""
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from typing import List, Optional
+
+import kaleido
+from plotly.graph_objects import Figure
+
+# Seconds to wait for kaleido's browser to start before exporting without it.
+WARM_UP_TIMEOUT = 30.0
+# Seconds a job waits for its figures to be written.
+RENDER_TIMEOUT = 120.0
+
+
+class RenderRequest:
+    """A figure waiting to be exported to an image file."""
+
+    def __init__(self, figure: Figure, path: str, format: str = None) -> None:
+        """Initialize a new RenderRequest instance."""
+        self.figure = figure
+        self.path = path
+        self.format = format or path.rsplit(".", 1)[-1]
+        self.error = None
+        self.cancelled = False
+        self.submitted = time.perf_counter()
+        self.completed = threading.Event()
+
+    def __repr__(self):
+        """Return a string representation of a RenderRequest instance."""
+        return f"<RenderRequest('{self.path}')>"
+
+
+class Renderer:
+    """Export plotly figures from a single thread that keeps kaleido warm.
+
+    kaleido starts a headless browser the first time a process exports a
+    figure, which costs seconds per job when every export pays it. The
+    renderer starts the browser once, then drains its queue in batches so
+    figures submitted by concurrent jobs share one browser round trip.
+    Latency is measured from submission until the image is written.
+
+    Requests that time out are cancelled. If the render thread has been
+    exporting a batch for longer than the timeout it is abandoned, and a new
+    thread serves the queue, so one hung export does not block every job.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 8,
+        history: int = 200,
+        warm_up_timeout: float = WARM_UP_TIMEOUT,
+        timeout: float = RENDER_TIMEOUT,
+    ) -> None:
+        """Initialize a new Renderer instance."""
+        self.batch_size = batch_size
+        self.warm_up_timeout = warm_up_timeout
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue()
+        self._latencies = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._busy_since: Optional[float] = None
+        self.warm = False
+        self.startup_seconds = None
+        self.renders = 0
+        self.failures = 0
+        self.batches = 0
+        self.abandoned = 0
+
+    def start(self) -> None:
+        """Start the render thread unless it is already running."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._work, name="chart-renderer", daemon=True
+                )
+                self._thread.start()
+
+    def render(self, figure: Figure, path: str, format: str = None) -> None:
+        """Export a figure to path and wait until it is written."""
+        self.render_batch([RenderRequest(figure, path, format)])
+
+    def render_batch(self, requests: List[RenderRequest]) -> None:
+        """Export several figures and wait until all of them are written.
+
+        Raises the first error encountered by any of the requests, or if they
+        are not all written within the renderer's timeout.
+        """
+        self.start()
+        for request in requests:
+            self._queue.put(request)
+        deadline = time.perf_counter() + self.timeout
+        for request in requests:
+            if not request.completed.wait(max(deadline - time.perf_counter(), 0)):
+                for pending in requests:
+                    pending.cancelled = True
+                self._abandon_stuck()
+                raise (
+                    Exception(
+                        f"{request.path} - Chart export timed out after"
+                        f" {self.timeout} seconds."
+                    )
+                )
+        for request in requests:
+            if request.error:
+                raise request.error
+
+    def metrics(self) -> dict:
+        """Return render counts and latency statistics in seconds."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "warm": self.warm,
+            "startup_seconds": self.startup_seconds,
+            "queued": self._queue.qsize(),
+            "renders": self.renders,
+            "failures": self.failures,
+            "batches": self.batches,
+            "abandoned": self.abandoned,
+            "latency": {
+                "last": self._latencies[-1] if self._latencies else None,
+                "mean": sum(latencies) / len(latencies) if latencies else None,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] if latencies else None,
+            },
+        }
+
+    def _warm_up(self) -> None:
+        """Start kaleido's browser ahead of the first real export.
+
+        kaleido can hang rather than fail when the browser cannot start, so
+        the warm up runs on its own thread. If it fails or times out, the
+        sync server is stopped and every export falls back to write_image,
+        which reports errors to the job.
+        """
+        started = time.perf_counter()
+        done = threading.Event()
+        succeeded = threading.Event()
+
+        def warm_up() -> None:
+            try:
+                if hasattr(kaleido, "start_sync_server"):
+                    # kaleido 1.x keeps a browser open for all sync exports.
+                    kaleido.start_sync_server(silence_warnings=True)
+                # Exporting an empty figure launches the browser (or the
+                # kaleido 0.2 subprocess) so the first plot does not pay for it.
+                Figure().to_image(format="png", width=10, height=10)
+                succeeded.set()
+            except Exception:
+                traceback.print_exc()
+            finally:
+                done.set()
+
+        threading.Thread(target=warm_up, name="chart-warm-up", daemon=True).start()
+        if not done.wait(self.warm_up_timeout):
+            print(f"Chart renderer warm up timed out after {self.warm_up_timeout}s.")
+        # A warm up finishing after the timeout is ignored, as the sync server
+        # is stopped by then.
+        self.warm = done.is_set() and succeeded.is_set()
+        if not self.warm:
+            self._stop_sync_server()
+        self.startup_seconds = time.perf_counter() - started
+
+    def _stop_sync_server(self) -> None:
+        """Stop kaleido's sync server, without waiting on a hung browser."""
+        if not hasattr(kaleido, "stop_sync_server"):
+            return
+
+        def stop() -> None:
+            try:
+                kaleido.stop_sync_server(silence_warnings=True)
+            except Exception:
+                traceback.print_exc()
+
+        stopper = threading.Thread(target=stop, name="chart-stop", daemon=True)
+        stopper.start()
+        stopper.join(self.warm_up_timeout)
+
+    def _abandon_stuck(self) -> None:
+        """Replace the render thread if it is stuck exporting a batch.
+
+        A hung export cannot be interrupted, so the thread is left to finish
+        or hang on its own and exits once it returns.
+        """
+        with self._lock:
+            if (
+                self._busy_since is None
+                or time.perf_counter() - self._busy_since < self.timeout
+            ):
+                return
+            print(
+                f"Chart renderer stuck for over {self.timeout}s, starting a new thread."
+            )
+            self._thread = None
+            self._busy_since = None
+            self.abandoned += 1
+        self.start()
+
+    def _export(self, batch: List[RenderRequest]) -> None:
+        """Write a batch of figures, recording an error on failed requests."""
+        # Batches go through the sync server, so only once it has started.
+        if (
+            self.warm
+            and len(batch) > 1
+            and hasattr(kaleido, "write_fig_from_object_sync")
+        ):
+            errors = kaleido.write_fig_from_object_sync(
+                [
+                    {
+                        "fig": request.figure,
+                        "path": request.path,
+                        "opts": {
+                            "format": request.format,
+                            "width": request.figure.layout.width,
+                            "height": request.figure.layout.height,
+                        },
+                    }
+                    for request in batch
+                ]
+            )
+            if not errors:
+                return
+            # The batch does not say which figures failed, so retry them one
+            # at a time below.
+        for request in batch:
+            try:
+                request.figure.write_image(request.path, format=request.format)
+            except Exception as e:
+                request.error = e
+
+    def _work(self) -> None:
+        """Export queued figures until the thread is abandoned."""
+        current = threading.current_thread()
+        self._warm_up()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Nobody waits on cancelled requests any more, so skip them.
+            for request in batch:
+                if request.cancelled:
+                    request.completed.set()
+            batch = [request for request in batch if not request.cancelled]
+            if not batch:
+                continue
+            with self._lock:
+                self._busy_since = time.perf_counter()
+            try:
+                self._export(batch)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            with self._lock:
+                abandoned = self._thread is not current
+                if not abandoned:
+                    self._busy_since = None
+            finished = time.perf_counter()
+            self.batches += 1
+            for request in batch:
+                if request.error:
+                    self.failures += 1
+                else:
+                    self.renders += 1
+                    self._latencies.append(finished - request.submitted)
+                request.completed.set()
+            if abandoned:
+                return
+
+
+renderer = Renderer()
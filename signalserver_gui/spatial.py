@@ -0,0 +1,146 @@
+"""This module contains the spatial index of station locations."""
+import math
+from typing import List, Tuple
+
+import numpy as np
+import pyproj
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .station import Station
+
+# The stations table is mirrored into an SQLite R*Tree by triggers, so the
+# index stays in sync with every insert, update and delete, whether made
+# through the ORM or not.
+INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS station_rtree USING rtree(
+        id, min_latitude, max_latitude, min_longitude, max_longitude
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS station_rtree_insert AFTER INSERT ON stations
+    BEGIN
+        INSERT OR REPLACE INTO station_rtree VALUES (
+            new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS station_rtree_update
+    AFTER UPDATE OF id, latitude, longitude ON stations
+    BEGIN
+        DELETE FROM station_rtree WHERE id = old.id;
+        INSERT INTO station_rtree VALUES (
+            new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS station_rtree_delete AFTER DELETE ON stations
+    BEGIN
+        DELETE FROM station_rtree WHERE id = old.id;
+    END""",
+]
+# Rebuild entries of databases created before the index, or edited without
+# the triggers.
+BACKFILL = [
+    "DELETE FROM station_rtree WHERE id NOT IN (SELECT id FROM stations)",
+    """INSERT OR REPLACE INTO station_rtree
+    SELECT s.id, s.latitude, s.latitude, s.longitude, s.longitude
+    FROM stations s LEFT JOIN station_rtree r ON r.id = s.id
+    WHERE r.id IS NULL
+        OR r.min_latitude > s.latitude OR r.max_latitude < s.latitude
+        OR r.min_longitude > s.longitude OR r.max_longitude < s.longitude""",
+]
+# Kilometres per degree of latitude at the equator, the shortest anywhere,
+# and per degree of longitude at the equator, the longest anywhere.
+KM_PER_DEGREE_LATITUDE = 110.574
+KM_PER_DEGREE_LONGITUDE = 111.320
+# Half the earth's circumference; no two points are further apart.
+MAX_DISTANCE = 20004.0
+
+
+def create_index(engine: Engine) -> None:
+    """Create the station spatial index and bring it up to date."""
+    with engine.begin() as connection:
+        for statement in INDEX_DDL + BACKFILL:
+            connection.execute(text(statement))
+
+
+def bounding_boxes(
+    latitude: float, longitude: float, radius: float
+) -> List[Tuple[float, float, float, float]]:
+    """Return (south, north, west, east) boxes covering a circle in km.
+
+    The boxes are slightly larger than the circle. A circle crossing the
+    antimeridian is split into two boxes, and one reaching a pole covers
+    every longitude.
+    """
+    # Widen by 1% to cover the ellipsoid's deviation from these constants.
+    radius *= 1.01
+    delta = radius / KM_PER_DEGREE_LATITUDE
+    south, north = latitude - delta, latitude + delta
+    if south <= -90 or north >= 90:
+        return [(max(south, -90), min(north, 90), -180, 180)]
+    widest = math.cos(math.radians(max(abs(south), abs(north))))
+    delta = radius / (KM_PER_DEGREE_LONGITUDE * widest)
+    if delta >= 180:
+        return [(south, north, -180, 180)]
+    west, east = longitude - delta, longitude + delta
+    if west < -180:
+        return [(south, north, west + 360, 180), (south, north, -180, east)]
+    if east > 180:
+        return [(south, north, west, 180), (south, north, -180, east - 360)]
+    return [(south, north, west, east)]
+
+
+def within(
+    db: Session, latitude: float, longitude: float, radius: float
+) -> List[Tuple[Station, float, float]]:
+    """Return (station, distance km, azimuth) of stations within radius km.
+
+    Candidates are read from the R*Tree by bounding box, then filtered by
+    their geodesic distance. Results are ordered by ascending distance.
+    """
+    ids = set()
+    for south, north, west, east in bounding_boxes(latitude, longitude, radius):
+        ids.update(
+            row[0]
+            for row in db.execute(
+                text(
+                    "SELECT id FROM station_rtree"
+                    " WHERE max_latitude >= :south AND min_latitude <= :north"
+                    " AND max_longitude >= :west AND min_longitude <= :east"
+                ),
+                {"south": south, "north": north, "west": west, "east": east},
+            )
+        )
+    if not ids:
+        return []
+    stations = db.query(Station).filter(Station.id.in_(ids)).all()
+    azimuth, _, distance = pyproj.Geod(ellps="WGS84").inv(
+        np.full(len(stations), longitude),
+        np.full(len(stations), latitude),
+        np.array([station.longitude for station in stations]),
+        np.array([station.latitude for station in stations]),
+    )
+    distance = np.asarray(distance) / 1000
+    azimuth = np.asarray(azimuth) % 360
+    order = np.argsort(distance, kind="stable")
+    return [
+        (stations[i], float(distance[i]), float(azimuth[i]))
+        for i in order
+        if distance[i] <= radius
+    ]
+
+
+def nearest(
+    db: Session, latitude: float, longitude: float, count: int
+) -> List[Tuple[Station, float, float]]:
+    """Return (station, distance km, azimuth) of the count nearest stations.
+
+    The search radius doubles until it holds count stations. Every station
+    closer than the furthest one found is within the radius, so the first
+    count are the nearest.
+    """
+    radius = 10.0
+    while True:
+        found = within(db, latitude, longitude, radius)
+        if len(found) >= count or radius >= MAX_DISTANCE:
+            return found[:count]
+        radius = min(radius * 2, MAX_DISTANCE)
@@ -0,0 +1,170 @@
+"""This module contains the web mercator tile pyramid of a plot image."""
+import json
+import math
+import os
+import shutil
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from .image import read_ppm, write_png
+
+TILE_SIZE = 256
+# Deepest zoom level tiled, however fine the plot's resolution.
+MAX_ZOOM = 18
+# Latitude limit of the web mercator projection.
+MAX_LATITUDE = 85.0511287798
+# Largest number of tiles across the preview shown on the files page.
+PREVIEW_TILES = 4
+
+
+def mercator_y(latitude: np.ndarray) -> np.ndarray:
+    """Return the web mercator y (0.0 north - 1.0 south) of latitudes."""
+    latitude = np.radians(np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE))
+    return (1 - np.log(np.tan(latitude) + 1 / np.cos(latitude)) / math.pi) / 2
+
+
+def mercator_latitude(y: np.ndarray) -> np.ndarray:
+    """Return the latitude of web mercator y values, the inverse of mercator_y."""
+    return np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * np.asarray(y)))))
+
+
+def zoom_levels(
+    bounds: Tuple[float, float, float, float], width: int
+) -> Tuple[int, int]:
+    """Return the (min, max) zoom levels to tile an image with bounds.
+
+    The deepest level matches the image's resolution along the equator, and
+    the shallowest fits the image in a single tile.
+    """
+    north, east, south, west = bounds
+    span = max(east - west, 1e-9)
+    max_zoom = math.ceil(math.log2(360 * width / (span * TILE_SIZE)))
+    min_zoom = math.floor(math.log2(360 / span))
+    max_zoom = min(max(max_zoom, 0), MAX_ZOOM)
+    return min(max(min_zoom, 0), max_zoom), max_zoom
+
+
+def tile_range(
+    bounds: Tuple[float, float, float, float], zoom: int
+) -> Tuple[int, int, int, int]:
+    """Return the (x0, x1, y0, y1) tiles covering bounds at a zoom level.
+
+    Ranges are inclusive. x may exceed the tile count for images crossing
+    the antimeridian, and wraps when tiles are written.
+    """
+    north, east, south, west = bounds
+    count = 2**zoom
+    x0 = math.floor((west + 180) / 360 * count)
+    x1 = math.ceil((east + 180) / 360 * count) - 1
+    y0 = math.floor(float(mercator_y(north)) * count)
+    y1 = min(math.ceil(float(mercator_y(south)) * count) - 1, count - 1)
+    return x0, max(x0, x1), y0, max(y0, y1)
+
+
+def make_tiles(
+    ppm_file: str,
+    bounds: Tuple[float, float, float, float],
+    path: str,
+    opacity: float = 1.0,
+    recolor: Callable[[np.ndarray], np.ndarray] = None,
+) -> dict:
+    """Slice a signalserver ppm into z/x/y.png web mercator tiles under path.
+
+    Every zoom level from a single tile down to the ppm's resolution is
+    sampled by nearest neighbour straight from the memory mapped ppm, a row
+    of tiles at a time, so only the source rows a tile row needs are read.
+    Fully transparent tiles are skipped, so map clients see a 404 for them.
+
+    recolor, if given, maps the ppm's RGB pixels to the colors tiles are
+    painted with.
+
+    Tiles are written to a staging directory that replaces path once
+    complete, with the pyramid's bounds and zoom levels in tiles.json.
+    """
+    north, east, south, west = bounds
+    if east < west:
+        east += 360
+    bounds = (north, east, south, west)
+    pixels = read_ppm(ppm_file)
+    height, width, _ = pixels.shape
+    min_zoom, max_zoom = zoom_levels(bounds, width)
+    alpha = round(255 * min(max(opacity, 0.0), 1.0))
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    metadata = {
+        "bounds": [west, south, east if east <= 180 else east - 360, north],
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "tile_size": TILE_SIZE,
+        "tiles": 0,
+        "preview": None,
+    }
+    for zoom in range(min_zoom, max_zoom + 1):
+        count = 2**zoom
+        x0, x1, y0, y1 = tile_range(bounds, zoom)
+        # Map every pixel column of the row of tiles to a ppm column.
+        longitude = (np.arange(x0 * TILE_SIZE, (x1 + 1) * TILE_SIZE) + 0.5) / (
+            count * TILE_SIZE
+        ) * 360 - 180
+        columns = np.floor((longitude - west) / (east - west) * width).astype(np.intp)
+        inside_columns = np.flatnonzero((columns >= 0) & (columns < width))
+        present = np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=bool)
+        for y in range(y0, y1 + 1):
+            latitude = mercator_latitude(
+                (np.arange(y * TILE_SIZE, (y + 1) * TILE_SIZE) + 0.5)
+                / (count * TILE_SIZE)
+            )
+            rows = np.floor((north - latitude) / (north - south) * height).astype(
+                np.intp
+            )
+            inside_rows = np.flatnonzero((rows >= 0) & (rows < height))
+            # Tiles are cut from an opaque white RGBA strip, so blank pixels
+            # are found with a single comparison of packed 32 bit pixels.
+            strip = np.full((TILE_SIZE, len(longitude), 4), 255, dtype=np.uint8)
+            if len(inside_rows) and len(inside_columns):
+                rgb = pixels[np.ix_(rows[inside_rows], columns[inside_columns])]
+                if recolor:
+                    rgb = recolor(rgb)
+                strip[np.ix_(inside_rows, inside_columns, [0, 1, 2])] = rgb
+            blank = strip.view(np.uint32)[..., 0] == 0xFFFFFFFF
+            strip[..., 3] = np.where(blank, 0, alpha)
+            present[y - y0] = ~blank.reshape(TILE_SIZE, -1, TILE_SIZE).all(axis=(0, 2))
+            for i in np.flatnonzero(present[y - y0]):
+                directory = os.path.join(staging, str(zoom), str((x0 + i) % count))
+                os.makedirs(directory, exist_ok=True)
+                write_png(
+                    os.path.join(directory, f"{y}.png"),
+                    strip[:, i * TILE_SIZE : (i + 1) * TILE_SIZE],
+                )
+        metadata["tiles"] += int(present.sum())
+        if metadata["preview"] is None or max(present.shape) <= PREVIEW_TILES:
+            metadata["preview"] = preview(zoom, count, x0, y0, present)
+    os.makedirs(staging, exist_ok=True)
+    with open(os.path.join(staging, "tiles.json"), "w") as f:
+        json.dump(metadata, f, indent=4)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    return metadata
+
+
+def preview(zoom: int, count: int, x0: int, y0: int, present: np.ndarray) -> dict:
+    """Return the tiles of a zoom level as rows of {x, y, present} cells."""
+    rows: List[List[dict]] = []
+    for j, row in enumerate(present.tolist()):
+        rows.append(
+            [
+                {"x": (x0 + i) % count, "y": y0 + j, "present": painted}
+                for i, painted in enumerate(row)
+            ]
+        )
+    return {"zoom": zoom, "rows": rows}
+
+
+def load_tiles(path: str) -> dict:
+    """Return the metadata of a tile pyramid written by make_tiles, if any."""
+    try:
+        with open(os.path.join(path, "tiles.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -6,21 +6,33 @@ import glob
 import os
 from shlex import quote
 import subprocess
+import threading
+import time
+from typing import Callable, Optional, Tuple
 from zipfile import ZipFile
 
-import pandas as pd
+import numpy as np
 from plotly.graph_objects import Figure, Scatter
 import pyproj
 import simplekml
 from sqlalchemy import Boolean, DateTime, Float, Integer, String, Text, literal
-from sqlalchemy.orm import with_expression
+from sqlalchemy.orm import object_session, with_expression
 from sqlalchemy.sql.expression import desc
 
 from .analysis_report.analysis_report import AnalysisReport
+from .coverage_stats import write_coverage_stats
+from .cache import ResultCache, file_checksum, run_key
+from .link_report import LinkReport
+from . import colors, image
+from .pipeline import Pipeline
+from .renderer import renderer
 from .model import global_args, plot_args
 from .antenna import Antenna
 from .plot import Plot
+from .profile import SIDECAR, PathProfile
+from .raster import PlotRaster, parse_dimensions, profile_file
 from .station import Station
+from .tiles import make_tiles
 
 
 def which(program):
@@ -41,25 +53,109 @@ def which(program):
     return None
 
 
-def run(cmd: str, args: list = []) -> str:
-    """Execute a command using an external tool."""
+# Guards usage dicts shared by concurrently running pipeline stages.
+_usage_lock = threading.Lock()
+
+
+def run(cmd: str, args: list = [], usage: dict = None) -> str:
+    """Execute a command using an external tool.
+
+    If a usage dict is supplied, the user and system cpu seconds consumed by
+    the command are added to its "user" and "system" entries. Raises if the
+    command cannot be started or exits with a non-zero status.
+    """
     print("Running:", " ".join([cmd, *args]))
-    try:
-        app_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-        result = subprocess.run(
-            [cmd, *args],
-            cwd=app_path,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            check=True,
+    app_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    with subprocess.Popen(
+        [cmd, *args],
+        cwd=app_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    ) as process:
+        output = process.stdout.read()
+        if hasattr(os, "wait4"):
+            # Reap the child ourselves to collect its resource usage.
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if usage is not None:
+                with _usage_lock:
+                    usage["user"] = usage.get("user", 0.0) + rusage.ru_utime
+                    usage["system"] = usage.get("system", 0.0) + rusage.ru_stime
+        else:
+            process.wait()
+    if usage is not None:
+        with _usage_lock:
+            usage["processes"] = usage.get("processes", 0) + 1
+    if process.returncode:
+        raise (
+            Exception(
+                f"{cmd} - Exited with status {process.returncode}."
+                f" {output.decode('utf-8', 'replace')[-500:]}"
+            )
         )
-        return result.stdout.decode("utf-8")
-    except Exception as e:
-        return str(e)
+    return output.decode("utf-8")
+
+
+# Files signalserver writes next to its output base name. Only these are
+# cached, so files other stages write under the same base, such as the plot
+# .png, are never shared between plots through the cache.
+SIGNALSERVER_SUFFIXES = [
+    ".ppm",
+    ".kml",
+    ".txt",
+    ".dcf",
+    ".scf",
+    ".lcf",
+    "_curvature",
+    "_fresnel",
+    "_fresnel60",
+    "_profile",
+    "_reference",
+]
+
+
+def run_signalserver(
+    config: configparser.ConfigParser,
+    command: str,
+    args: list,
+    file_base: str,
+    usage: dict = None,
+    key: str = None,
+) -> str:
+    """Execute signalserver unless its results are in the result cache.
+
+    Caching is disabled when no cache_dir is configured. key defaults to the
+    run_key of the command and args.
+    """
+    if key is None:
+        key = run_key(command, args)
+    cache_dir = config["signalservergui"].get("cache_dir")
+    cache = ResultCache(cache_dir) if cache_dir else None
+    output = cache.fetch(key, file_base) if cache else None
+    if output is not None:
+        print("Cache hit:", key)
+        return output
+    ResultCache.detach(file_base)
+    started = time.time_ns()
+    # run raises when signalserver fails, so failed runs are never cached.
+    output = run(command, args, usage)
+    if cache:
+        artifacts = [
+            f"{file_base}{suffix}"
+            for suffix in SIGNALSERVER_SUFFIXES
+            if os.path.isfile(f"{file_base}{suffix}")
+            and os.stat(f"{file_base}{suffix}").st_mtime_ns >= started
+        ]
+        if artifacts:
+            cache.store(key, file_base, artifacts, output)
+    return output
+
 
+def generate(config: configparser.ConfigParser, item: Plot, usage: dict = None) -> str:
+    """Generate plot files.
 
-def generate(config: configparser.ConfigParser, item: Plot) -> str:
-    """Generate plot files."""
+    External tool cpu usage is accumulated into usage when provided.
+    """
     # Arg format: (flag, name, required, type, default, description)
     global_defaults = {
         "terrain_greyscale": False,
@@ -75,10 +171,19 @@ def generate(config: configparser.ConfigParser, item: Plot) -> str:
     }
 
     # Build string of arguments for signalserver.
+    # command_args are shared by both runs, area_args only apply to the coverage
+    # run and p2pa_args only to the point to point analysis run.
     command_args = []
+    area_args = []
     p2pa_args = []
     for key in global_args.keys():
         arg = global_args[key]
+        if arg.get("area_only"):
+            args = area_args
+        elif arg["depends"] and "do_p2p_analysis" in arg["depends"]:
+            args = p2pa_args
+        else:
+            args = command_args
         if arg["type"] == bool:
             if key in config["signalserver"]:
                 value = (
@@ -87,11 +192,11 @@ def generate(config: configparser.ConfigParser, item: Plot) -> str:
                     else global_defaults[key]
                 )
                 if value:
-                    command_args.append(arg["flag"])
+                    args.append(arg["flag"])
         elif not arg["depends"] or any(getattr(item, i) for i in arg["depends"]):
             if key in config["signalserver"]:
-                command_args.append(arg["flag"])
-                command_args.append(str(config["signalserver"][key]))
+                args.append(arg["flag"])
+                args.append(str(config["signalserver"][key]))
 
     for key in plot_args["plot"].keys():
         arg = plot_args["plot"][key]
@@ -206,55 +311,271 @@ def generate(config: configparser.ConfigParser, item: Plot) -> str:
         command = config["signalserver"]["path"] + "HD"
     else:
         command = config["signalserver"]["path"]
-    # Run signalserver command and capture output for use in kml.
-    dimensions = run(command, command_args).split("|")
-    print(f"Dimension: {dimensions}")
-    run(
-        config["convert"]["path"],
-        [
-            f"{file_base}.ppm",
-            "-transparent",
-            "white",
-            "-alpha",
-            "set",
-            "-background",
-            "none",
-            "-channel",
-            "A",
-            "-evaluate",
-            "multiply",
-            str(item.opacity),
-            f"{file_base}.{config['convert']['output_type']}",
-        ],
+    image_type = config["convert"]["output_type"]
+    color_profile = config["signalserver"]["color_profile"]
+
+    # Each stage is only re-executed when its params or an upstream stage
+    # changed, so post-processing changes such as opacity or the image type
+    # rebuild the image and kmz from the retained raw signalserver results.
+    # Once signalserver has finished, the image, analysis plot and report are
+    # built concurrently. Stages run on worker threads, so every relationship
+    # of item they use must already be loaded when the pipeline starts.
+    pipeline = Pipeline(item_path)
+
+    def coverage(values: dict) -> str:
+        return run_signalserver(
+            config, command, command_args + area_args, file_base, usage
+        )
+
+    pipeline.add(
+        "coverage",
+        coverage,
+        params={"key": run_key(command, command_args + area_args)},
+        outputs=[f"{file_base}.ppm"],
     )
+    kmz_after = ["coverage", "image"]
+    image_waits = []
 
     if item.do_p2p_analysis:
-        p2pa_args.append("-ng")
-        command_args.extend(p2pa_args)
-        results = run(command, command_args)
-        make_analysis_plot(item, file_base, results, config["convert"]["output_type"])
-        report = AnalysisReport.from_file(quote(f"{file_base}.txt"))
-        with open(f"{file_base}.json", "w") as f:
-            f.write(report.to_json())
-        make_kmz(item, file_base, dimensions, config["convert"]["output_type"], report)
-    else:
-        make_kmz(item, file_base, dimensions, config["convert"]["output_type"])
+        # Rx coordinates put signalserver in point to point mode, which skips
+        # the area coverage computation, so this run only costs the path
+        # analysis. It shares the coverage run's output base, so it must not
+        # run until the coverage run has finished, and stages writing files
+        # under that base wait for it, as its cache entry collects the
+        # signalserver files modified during the run.
+        if "-ng" not in p2pa_args:
+            p2pa_args.append("-ng")
+
+        def ppa(values: dict) -> str:
+            return run_signalserver(
+                config, command, command_args + p2pa_args, file_base, usage
+            )
+
+        def report(values: dict) -> None:
+            report = AnalysisReport.from_file(quote(f"{file_base}.txt"))
+            # Indented json goes through the pure Python encoder, which is
+            # several times slower than parsing the report.
+            with open(f"{file_base}.json", "w") as f:
+                f.write(report.to_json(compact=True))
+
+        pipeline.add(
+            "ppa",
+            ppa,
+            params={"key": run_key(command, command_args + p2pa_args)},
+            after=["coverage"],
+            outputs=[
+                f"{file_base}{suffix}"
+                for suffix in [
+                    ".txt",
+                    "_curvature",
+                    "_fresnel",
+                    "_fresnel60",
+                    "_profile",
+                    "_reference",
+                ]
+            ],
+        )
+        # Readers of the profile series load this binary copy instead of
+        # parsing the text data files.
+        pipeline.add(
+            "profile",
+            lambda values: PathProfile.from_files(file_base).save(
+                f"{file_base}{SIDECAR}"
+            ),
+            after=["ppa"],
+            outputs=[f"{file_base}{SIDECAR}"],
+        )
+        pipeline.add(
+            "analysis_plot",
+            lambda values: make_analysis_plot(
+                item, file_base, values["ppa"], image_type
+            ),
+            params={"use_metric_units": item.use_metric_units},
+            after=["ppa", "profile"],
+            outputs=[f"{file_base}_ppa.{image_type}"],
+        )
+        pipeline.add("report", report, after=["ppa"], outputs=[f"{file_base}.json"])
+        kmz_after.extend(["analysis_plot", "report"])
+        image_waits.append("ppa")
+
+    thresholds = config["signalservergui"].get("coverage_thresholds")
+    if thresholds:
+        thresholds = [float(value) for value in thresholds.split(",")]
+
+    def statistics(values: dict) -> None:
+        raster = PlotRaster.open(
+            file_base, values["coverage"], color_profile, item.use_dbm
+        )
+        write_coverage_stats(raster, f"{file_base}_coverage.json", thresholds)
+
+    pipeline.add(
+        "coverage_stats",
+        statistics,
+        params={"thresholds": thresholds, "use_dbm": item.use_dbm},
+        after=["coverage"],
+        outputs=[f"{file_base}_coverage.json"],
+        waits=image_waits,
+    )
+
+    # The color profile is not a signalserver input. Images and tiles are
+    # repainted with it from the retained raster, so changing it only reruns
+    # them.
+    profile_checksum = file_checksum(color_profile)
+
+    pipeline.add(
+        "image",
+        lambda values: make_image(config, item, file_base, usage),
+        params={
+            "opacity": item.opacity,
+            "image_type": image_type,
+            "color_profile": profile_checksum,
+        },
+        after=["coverage"],
+        outputs=[f"{file_base}.{image_type}"],
+        waits=image_waits,
+    )
+
+    pipeline.add(
+        "tiles",
+        lambda values: make_tiles(
+            f"{file_base}.ppm",
+            parse_dimensions(values["coverage"]),
+            os.path.join(item_path, "tiles"),
+            item.opacity,
+            plot_recolor(config, item, file_base),
+        )["tiles"],
+        params={"opacity": item.opacity, "color_profile": profile_checksum},
+        after=["coverage"],
+        outputs=[os.path.join(item_path, "tiles", "tiles.json")],
+    )
+
+    def kmz(values: dict) -> None:
+        dimensions = parse_dimensions(values["coverage"])
+        print(f"Dimension: {dimensions}")
+        if item.do_p2p_analysis:
+            report = AnalysisReport.load(f"{file_base}.json")
+            make_kmz(item, file_base, dimensions, image_type, report)
+        else:
+            make_kmz(item, file_base, dimensions, image_type)
+
+    pipeline.add(
+        "kmz",
+        kmz,
+        params={
+            "use_metric_units": item.use_metric_units,
+            "do_p2p_analysis": item.do_p2p_analysis,
+            "stations": [
+                (station.name, station.latitude, station.longitude, station.height)
+                for station in [item.station1, item.station2]
+                if station
+            ],
+        },
+        after=kmz_after,
+        outputs=[f"{file_base}.kmz"],
+    )
+
+    def archive(values: dict) -> None:
+        with ZipFile(quote(f"{file_base}.zip"), "w") as zip:
+            # Directories, such as the tile pyramid, are left out.
+            for filename in glob.glob(f"{item_path}/*"):
+                if "zip" not in filename and os.path.isfile(filename):
+                    zip.write(filename, os.path.basename(filename))
+
+    pipeline.add(
+        "zip", archive, after=list(pipeline.stages), outputs=[f"{file_base}.zip"]
+    )
 
-    with ZipFile(quote(f"{file_base}.zip"), "w") as zip:
-        for filename in glob.glob(f"{item_path}/*"):
-            if "zip" not in filename:
-                zip.write(filename, os.path.basename(filename))
+    stages = pipeline.run()
+    if usage is not None:
+        usage["stages"] = stages
+
+    # Keep the plot's row in link_reports in step with its analysis report.
+    db = object_session(item)
+    if db is not None:
+        if not item.do_p2p_analysis:
+            if item.link_report is not None:
+                db.delete(item.link_report)
+        elif stages["report"]["ran"] or item.link_report is None:
+            LinkReport.record(db, item, AnalysisReport.load(f"{file_base}.json"))
     return ""
 
 
+def plot_recolor(
+    config: configparser.ConfigParser, item: Plot, file_base: str
+) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """Return a function repainting the plot's raster with the configured profile.
+
+    Returns None when signalserver already painted the raster with the same
+    colors, or when the profiles describe different units.
+    """
+    color_profile = config["signalserver"]["color_profile"]
+    if not os.path.isfile(color_profile):
+        return None
+    source = colors.load(profile_file(file_base, color_profile, item.use_dbm))
+    target = colors.load(color_profile)
+    if source.units != target.units:
+        print(f"Not recoloring {file_base}, {color_profile} is not in {source.units}.")
+        return None
+    if source.levels == target.levels and source.colors == target.colors:
+        return None
+    return lambda pixels: source.recolor(pixels, target)
+
+
+def make_image(
+    config: configparser.ConfigParser, item: Plot, file_base: str, usage: dict = None
+) -> None:
+    """Convert the signalserver ppm into a plot image with a transparent background.
+
+    The image is painted with the configured color profile. png images are
+    written natively. Other image types require convert.
+    """
+    image_type = config["convert"]["output_type"]
+    recolor = plot_recolor(config, item, file_base)
+    if image_type == "png":
+        image.ppm_to_png(
+            f"{file_base}.ppm", f"{file_base}.png", item.opacity, recolor=recolor
+        )
+        return
+    source = f"{file_base}.ppm"
+    if recolor:
+        source = f"{file_base}_recolored.ppm"
+        image.recolor_ppm(f"{file_base}.ppm", source, recolor)
+    try:
+        run(
+            config["convert"]["path"],
+            [
+                source,
+                "-transparent",
+                "white",
+                "-alpha",
+                "set",
+                "-background",
+                "none",
+                "-channel",
+                "A",
+                "-evaluate",
+                "multiply",
+                str(item.opacity),
+                f"{file_base}.{image_type}",
+            ],
+            usage,
+        )
+    finally:
+        if recolor:
+            os.remove(source)
+
+
 def make_kmz(
     item: Plot,
     file_base: str,
-    dimensions: list,
+    dimensions: Tuple[float, float, float, float],
     image_type="png",
     report: AnalysisReport = None,
 ):
-    """Generate a keyhole markup file representing the plot."""
+    """Generate a keyhole markup file representing the plot.
+
+    dimensions are the plot image's (north, east, south, west) bounds.
+    """
     # TODO(Justin): Convert units to metric if plot is using imperial units.
     azimuth = 0
     description = f"Longitude: {item.station1.longitude} Latitude:{item.station1.latitude} Height: {item.station1.height}"
@@ -343,10 +664,12 @@ def make_kmz(
     plot.icon.href = plot_file
     plot.altitude = item.station1.height
     plot.altitudemode = simplekml.AltitudeMode.relativetoground
-    plot.latlonbox.north = dimensions[1]
-    plot.latlonbox.east = dimensions[2]
-    plot.latlonbox.south = dimensions[3]
-    plot.latlonbox.west = dimensions[4]
+    (
+        plot.latlonbox.north,
+        plot.latlonbox.east,
+        plot.latlonbox.south,
+        plot.latlonbox.west,
+    ) = dimensions
 
     if item.do_p2p_analysis and report:
         # Add additional components to kml for p2p analysis.
@@ -495,41 +818,23 @@ def convert_ant_file(ant_file: str, azimuth_offset=0, elevation_offset=0) -> Non
 
 
 def make_analysis_plot(
-    item: Plot, file_base: str, results: str, image_type="png"
+    item: Plot,
+    file_base: str,
+    results: str,
+    image_type="png",
+    profile: PathProfile = None,
 ) -> None:
-    """Generate a P2P analysis graph image from signalserver analysis files."""
-    with open(quote(f"{file_base}_curvature")) as f:
-        curvature = [
-            (float(line.split(" ")[0]), float(line.split(" ")[1])) for line in f
-        ]
-    with open(quote(f"{file_base}_fresnel")) as f:
-        fresnel = [(float(line.split(" ")[0]), float(line.split(" ")[1])) for line in f]
-
-    with open(quote(f"{file_base}_fresnel60")) as f:
-        fresnel60 = [
-            (float(line.split(" ")[0]), float(line.split(" ")[1])) for line in f
-        ]
-    with open(quote(f"{file_base}_profile")) as f:
-        profile = [(float(line.split(" ")[0]), float(line.split(" ")[1])) for line in f]
-    with open(file_base + "_reference") as f:
-        reference = [
-            (float(line.split(" ")[0]), float(line.split(" ")[1])) for line in f
-        ]
+    """Generate a P2P analysis graph image from signalserver analysis files.
 
-    reference_df = pd.DataFrame(reference, columns=["Distance", "Value"])
-    profile_df = pd.DataFrame(profile, columns=["Distance", "Value"])
-    curvature_df = pd.DataFrame(curvature, columns=["Distance", "Value"])
-    fresnel_bottom_df = pd.DataFrame(fresnel, columns=["Distance", "Value"])
-    fresnel60_bottom_df = pd.DataFrame(fresnel60, columns=["Distance", "Value"])
-    fresnel_top_df = fresnel_bottom_df.copy()
-    fresnel_top_df["Value"] = fresnel_top_df["Value"].multiply(-1)
-    fresnel60_top_df = fresnel60_bottom_df.copy()
-    fresnel60_top_df["Value"] = fresnel60_top_df["Value"].multiply(-1)
+    The profile is loaded from the plot's files unless one is supplied.
+    """
+    if profile is None:
+        profile = PathProfile.load(file_base)
     fig = Figure()
     fig.add_trace(
         Scatter(
-            x=reference_df["Distance"],
-            y=reference_df["Value"],
+            x=profile.reference[:, 0],
+            y=profile.reference[:, 1],
             mode="lines",
             line=dict(shape="linear", color="rgb(0, 0, 0)", width=4, dash="dot"),
             name="Line of Sight",
@@ -537,8 +842,8 @@ def make_analysis_plot(
     )
     fig.add_trace(
         Scatter(
-            x=curvature_df["Distance"],
-            y=curvature_df["Value"],
+            x=profile.curvature[:, 0],
+            y=profile.curvature[:, 1],
             mode="lines",
             line=dict(shape="linear", color="rgb(100, 100, 100)"),
             name="Earth Curvature",
@@ -547,8 +852,8 @@ def make_analysis_plot(
 
     fig.add_trace(
         Scatter(
-            x=fresnel60_bottom_df["Distance"],
-            y=fresnel60_bottom_df["Value"],
+            x=profile.fresnel60[:, 0],
+            y=profile.fresnel60[:, 1],
             mode="lines",
             line=dict(shape="linear", color="rgb(235, 60, 0)"),
             name="First Fresnel Zone (60%)",
@@ -556,8 +861,8 @@ def make_analysis_plot(
     )
     fig.add_trace(
         Scatter(
-            x=fresnel_bottom_df["Distance"],
-            y=fresnel_bottom_df["Value"],
+            x=profile.fresnel[:, 0],
+            y=profile.fresnel[:, 1],
             mode="lines",
             line=dict(shape="linear", color="rgb(150, 180, 0)"),
             name="First Fresnel Zone (100%)",
@@ -566,8 +871,8 @@ def make_analysis_plot(
 
     fig.add_trace(
         Scatter(
-            x=profile_df["Distance"],
-            y=profile_df["Value"],
+            x=profile.profile[:, 0],
+            y=profile.profile[:, 1],
             mode="lines",
             line=dict(shape="linear", color="rgb(101, 56, 24)"),
             name="Terrain Profile",
@@ -590,5 +895,5 @@ def make_analysis_plot(
         height=480,
         width=640,
     )
-    fig.write_image(f"{file_base}_ppa.{image_type}")
+    renderer.render(fig, f"{file_base}_ppa.{image_type}")
     # fig.show()